@@ -1,16 +1,134 @@
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
 import time
 import pandas as pd
-from matplotlib.patches import Circle, Wedge
-from matplotlib.collections import PatchCollection
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from functools import partial
 import plotly.graph_objects as go
 
-from utils.path_planning import a_star, dijkstra
-from utils.sensors import simulate_lidar, simulate_proximity_sensors
+from utils.path_planning import a_star, dijkstra, theta_star, ara_star
+from utils.sensors import simulate_lidar, simulate_proximity_sensors, SensorNoiseModel
 from utils.vehicle import Vehicle
 from utils.environment import Environment
+from utils.planning_service import PlanningService
+from utils.map_registry import MapRegistry
+from utils.simulation import encode_snapshot, decode_snapshot
+from utils.rrt_star import rrt_star
+from utils.hybrid_astar import hybrid_a_star
+from utils.quadtree import quadtree_a_star
+from utils.landmarks import alt_a_star
+from utils.route_planning import plan_route
+from utils.local_planner import DynamicWindowPlanner
+from utils.camera import DepthCamera
+
+# Time budget (seconds) for anytime planners, so the UI never blocks on large maps
+PLANNING_TIME_BUDGET = 0.2
+
+# RRT* runs a fixed number of iterations so its seeded paths do not depend on
+# machine speed; the time limit only stops it on maps far larger than usual
+RRT_ITERATIONS = 1000
+RRT_TIME_LIMIT = 2.0
+
+# Path planning algorithms available in the algorithm selector. Anytime
+# planners return (path, suboptimality bound) instead of a bare path.
+PLANNERS = {
+    "A*": a_star,
+    "ALT A*": alt_a_star,
+    "Dijkstra": dijkstra,
+    "Theta*": theta_star,
+    "ARA*": partial(ara_star, time_budget=PLANNING_TIME_BUDGET),
+    "RRT*": partial(rrt_star, max_iterations=RRT_ITERATIONS, time_budget=RRT_TIME_LIMIT, seed=0),
+    "Hybrid A*": hybrid_a_star,
+    "Quadtree A*": quadtree_a_star,
+}
+
+# Forward-facing camera shown in the sensor panel
+DEPTH_CAMERA = DepthCamera()
+
+@st.cache_resource
+def map_registry():
+    """
+    Maps and planned paths shared by every session of this server process.
+    """
+    return MapRegistry()
+
+@st.cache_resource
+def planning_executor():
+    """
+    Planner worker threads shared by every session of this server process;
+    each session keeps its own request slot in its PlanningService.
+    """
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="planner")
+
+def apply_plan(result):
+    """
+    Use a planner's result as the current path.
+    """
+    if isinstance(result, tuple):
+        result, st.session_state.plan_bound = result
+    st.session_state.path = result
+
+def request_plan():
+    """
+    Plan a new path in the background for the current position, goal and map,
+    unless another session has already planned the same request.
+    """
+    st.session_state.path = []
+    st.session_state.vehicle.path_index = 0
+    # Planners take the full pose; grid planners only use the position
+    start = (*st.session_state.vehicle.position, st.session_state.vehicle.heading)
+    if st.session_state.stops:
+        # Visit the extra stops on the way to the goal, in the best order found
+        planner = partial(plan_route, stops=st.session_state.stops)
+        planner_name = ("Route", tuple(st.session_state.stops))
+    else:
+        planner = PLANNERS[st.session_state.algorithm]
+        planner_name = st.session_state.algorithm
+    key = map_registry().path_key(planner_name, start, st.session_state.goal,
+                                  st.session_state.environment)
+    result = map_registry().cached_path(key)
+    if result is not None:
+        st.session_state.planning_service.cancel()
+        st.session_state.plan_future = None
+        apply_plan(result)
+        return
+    
+    st.session_state.plan_key = key
+    st.session_state.plan_future = st.session_state.planning_service.request(
+        planner,
+        start,
+        st.session_state.goal,
+        st.session_state.environment
+    )
+
+def invalidate_path():
+    """
+    Drop the current path after a goal or map change, replanning if the vehicle is running.
+    """
+    st.session_state.path = []
+    if st.session_state.is_running and st.session_state.control_mode == "Autonomous":
+        request_plan()
+    else:
+        st.session_state.planning_service.cancel()
+        st.session_state.plan_future = None
+
+def path_blocked(event):
+    """
+    Check if a map edit put an obstacle on the current path. Only the path
+    segments near the edited cells are checked.
+    """
+    points = np.asarray(st.session_state.path, dtype=float).reshape(-1, 2) if st.session_state.path else np.zeros((0, 2))
+    starts, ends = points[:-1], points[1:]
+    near = event.segments_near(starts, ends)
+    return bool(near.any()) and not st.session_state.environment.segments_clear(starts[near], ends[near]).all()
+
+def apply_map_edit(event):
+    """
+    Keep the path after a map edit unless the edit blocks it. A plan still in
+    flight was made for the old map, so it is always replaced.
+    """
+    if event is not None and (st.session_state.plan_future is not None or path_blocked(event)):
+        invalidate_path()
 
 # Page configuration
 st.set_page_config(
@@ -21,7 +139,9 @@ st.set_page_config(
 
 # Initialize session state variables
 if 'environment' not in st.session_state:
-    st.session_state.environment = Environment(grid_size=(20, 20))
+    # Start from the shared empty map; the grid is only copied once this session edits it
+    registry = map_registry()
+    st.session_state.environment = registry.environment(registry.publish(Environment(grid_size=(20, 20))))
     
 if 'vehicle' not in st.session_state:
     start_position = (1, 1)
@@ -32,8 +152,17 @@ if 'vehicle' not in st.session_state:
 if 'goal' not in st.session_state:
     st.session_state.goal = (18, 18)
 
+if 'stops' not in st.session_state:
+    st.session_state.stops = []
+
 if 'path' not in st.session_state:
     st.session_state.path = []
+
+if 'planning_service' not in st.session_state:
+    st.session_state.planning_service = PlanningService(executor=planning_executor())
+
+if 'plan_future' not in st.session_state:
+    st.session_state.plan_future = None
     
 if 'is_running' not in st.session_state:
     st.session_state.is_running = False
@@ -44,6 +173,12 @@ if 'control_mode' not in st.session_state:
 if 'algorithm' not in st.session_state:
     st.session_state.algorithm = "A*"
     
+if 'local_planner' not in st.session_state:
+    st.session_state.local_planner = None
+    
+if 'sensor_noise' not in st.session_state:
+    st.session_state.sensor_noise = None
+    
 if 'telemetry' not in st.session_state:
     st.session_state.telemetry = pd.DataFrame(columns=['Time', 'X', 'Y', 'Heading', 'Velocity'])
     
@@ -53,6 +188,18 @@ if 'time_elapsed' not in st.session_state:
 # Main title
 st.title("🤖 Autonomous Vehicle Simulation")
 
+# Scan once per rerun, so the map and the sensor panel show the same (noisy)
+# scan and the vehicle's generator advances once per tick
+lidar_points = []
+if st.session_state.control_mode == "Autonomous":
+    lidar_points = simulate_lidar(st.session_state.vehicle.position, 
+                                  st.session_state.vehicle.heading, 
+                                  st.session_state.environment,
+                                  num_rays=12, 
+                                  max_range=5,
+                                  noise=st.session_state.sensor_noise,
+                                  rng=st.session_state.vehicle.rng)
+
 # Split the screen into a main area and a sidebar
 main_col1, main_col2 = st.columns([3, 2])
 
@@ -131,6 +278,20 @@ with main_col1:
         name='Goal'
     ))
     
+    # Draw extra stops
+    if st.session_state.stops:
+        fig.add_trace(go.Scatter(
+            x=[stop[0] for stop in st.session_state.stops], 
+            y=[stop[1] for stop in st.session_state.stops],
+            mode='markers',
+            marker=dict(
+                symbol='diamond',
+                size=12,
+                color='purple',
+            ),
+            name='Stops'
+        ))
+    
     # Draw path if it exists
     if st.session_state.path:
         path_x = [p[0] for p in st.session_state.path]
@@ -145,13 +306,6 @@ with main_col1:
     
     # Draw sensor readings
     if st.session_state.control_mode == "Autonomous":
-        # Simulate LiDAR
-        lidar_points = simulate_lidar(st.session_state.vehicle.position, 
-                                    st.session_state.vehicle.heading, 
-                                    st.session_state.environment,
-                                    num_rays=12, 
-                                    max_range=5)
-        
         if lidar_points:
             lidar_x = [p[0] for p in lidar_points]
             lidar_y = [p[1] for p in lidar_points]
@@ -186,24 +340,11 @@ with main_col1:
         if st.button("Start/Resume" if not st.session_state.is_running else "Pause"):
             st.session_state.is_running = not st.session_state.is_running
             
-            # If starting, plan a path
+            # If starting, plan a path in the background with the selected algorithm
             if st.session_state.is_running and st.session_state.control_mode == "Autonomous":
-                # Plan path based on selected algorithm
-                if st.session_state.algorithm == "A*":
-                    st.session_state.path = a_star(
-                        st.session_state.vehicle.position, 
-                        st.session_state.goal, 
-                        st.session_state.environment
-                    )
-                else:  # Dijkstra
-                    st.session_state.path = dijkstra(
-                        st.session_state.vehicle.position, 
-                        st.session_state.goal, 
-                        st.session_state.environment
-                    )
+                request_plan()
                 
                 # Reset vehicle attributes for new run
-                st.session_state.vehicle.path_index = 0
                 st.session_state.telemetry = pd.DataFrame(columns=['Time', 'X', 'Y', 'Heading', 'Velocity'])
                 st.session_state.time_elapsed = 0
                 
@@ -215,14 +356,14 @@ with main_col1:
             st.session_state.vehicle.velocity = 0
             st.session_state.vehicle.path_index = 0
             st.session_state.is_running = False
-            st.session_state.path = []
+            invalidate_path()
             st.session_state.telemetry = pd.DataFrame(columns=['Time', 'X', 'Y', 'Heading', 'Velocity'])
             st.session_state.time_elapsed = 0
             
     with control_col3:
         if st.button("Clear Obstacles"):
             st.session_state.environment.clear_obstacles()
-            st.session_state.path = []
+            invalidate_path()
             st.rerun()
             
     # Manual controls for the vehicle if in manual mode
@@ -287,10 +428,29 @@ with main_col1:
                 st.session_state.vehicle.heading = (st.session_state.vehicle.heading - 15) % 360
                 st.rerun()
     
+    # Collect the background plan once it is ready
+    plan_future = st.session_state.plan_future
+    if plan_future is not None and plan_future.done():
+        st.session_state.plan_future = None
+        try:
+            result = plan_future.result()
+        except CancelledError:
+            result = []
+        else:
+            # Share successful plans with other sessions on the same map
+            if (result[0] if isinstance(result, tuple) else result):
+                map_registry().store_path(st.session_state.plan_key, result)
+        apply_plan(result)
+    
+    # Keep rendering while a plan is in flight; the rerun at the end of the script polls it again
+    if st.session_state.plan_future is not None:
+        st.info("Planning path...")
+    
     # Update simulation if running (for autonomous mode)
-    if st.session_state.is_running and st.session_state.control_mode == "Autonomous":
+    elif st.session_state.is_running and st.session_state.control_mode == "Autonomous":
         # Move vehicle along the path
-        reached_goal = st.session_state.vehicle.follow_path(st.session_state.path)
+        reached_goal = st.session_state.vehicle.follow_path(st.session_state.path,
+                                                            local_planner=st.session_state.local_planner)
         
         # Record telemetry
         new_row = pd.DataFrame({
@@ -327,22 +487,40 @@ with main_col2:
         if (goal_x, goal_y) != st.session_state.goal:
             st.session_state.goal = (goal_x, goal_y)
             # Clear existing path when goal changes
-            st.session_state.path = []
+            invalidate_path()
+        
+        # Extra stops visited on the way to the goal
+        stops_text = st.text_input("Extra Stops", value="; ".join(f"{x},{y}" for x, y in st.session_state.stops),
+                                   help="Positions to visit before the goal, e.g. 5,10; 12,3. The visiting order is optimized.")
+        try:
+            stops = [tuple(int(v) for v in stop.split(",")) for stop in stops_text.split(";") if stop.strip()]
+            if any(len(stop) != 2 or not st.session_state.environment.is_valid_position(stop) for stop in stops):
+                raise ValueError
+        except ValueError:
+            st.error("Stops must be free cells written as x,y separated by semicolons.")
+            stops = st.session_state.stops
+        if stops != st.session_state.stops:
+            st.session_state.stops = stops
+            invalidate_path()
         
         # Add obstacles
         st.subheader("Add Obstacles")
         obstacle_col1, obstacle_col2, obstacle_col3 = st.columns(3)
         with obstacle_col1:
             obs_x = st.number_input("Obstacle X", min_value=0, max_value=st.session_state.environment.grid_size[0]-1, value=5)
+            obs_w = st.number_input("Width", min_value=1, max_value=st.session_state.environment.grid_size[0], value=1)
         with obstacle_col2:
             obs_y = st.number_input("Obstacle Y", min_value=0, max_value=st.session_state.environment.grid_size[1]-1, value=5)
+            obs_h = st.number_input("Height", min_value=1, max_value=st.session_state.environment.grid_size[1], value=1)
         with obstacle_col3:
             if st.button("Add Obstacle"):
-                # Don't add obstacles at vehicle or goal positions
-                if (obs_x, obs_y) != st.session_state.vehicle.position and (obs_x, obs_y) != st.session_state.goal:
-                    st.session_state.environment.add_obstacle((obs_x, obs_y))
-                    # Clear existing path when obstacles change
-                    st.session_state.path = []
+                # Don't cover the vehicle or the goal
+                corner, opposite = (obs_x, obs_y), (obs_x + obs_w - 1, obs_y + obs_h - 1)
+                covered = [p for p in (st.session_state.vehicle.position, st.session_state.goal)
+                           if corner[0] - 0.5 <= p[0] < opposite[0] + 0.5 and corner[1] - 0.5 <= p[1] < opposite[1] + 0.5]
+                if not covered:
+                    # The whole rectangle is one edit; the path is only dropped if it is blocked
+                    apply_map_edit(st.session_state.environment.fill_rectangle(corner, opposite))
                     st.rerun()
         
         # Generate random obstacles
@@ -353,7 +531,7 @@ with main_col2:
                 exclude=[st.session_state.vehicle.position, st.session_state.goal]
             )
             # Clear existing path when obstacles change
-            st.session_state.path = []
+            invalidate_path()
             st.rerun()
     
     # Control Mode and Algorithm Selection
@@ -365,15 +543,29 @@ with main_col2:
         if control_mode != st.session_state.control_mode:
             st.session_state.control_mode = control_mode
             st.session_state.is_running = False
-            st.session_state.path = []
+            invalidate_path()
             st.rerun()
         
         # Algorithm selector (only for autonomous mode)
         if st.session_state.control_mode == "Autonomous":
-            algorithm = st.radio("Pathfinding Algorithm", ["A*", "Dijkstra"], index=0 if st.session_state.algorithm == "A*" else 1)
+            algorithms = list(PLANNERS)
+            algorithm = st.radio("Pathfinding Algorithm", algorithms, index=algorithms.index(st.session_state.algorithm))
             if algorithm != st.session_state.algorithm:
                 st.session_state.algorithm = algorithm
-                st.session_state.path = []
+                invalidate_path()
+            
+            # Local obstacle avoidance on top of the planned path
+            avoid = st.checkbox("Local Obstacle Avoidance (DWA)", value=st.session_state.local_planner is not None,
+                                help="Steer around obstacles with the Dynamic Window Approach instead of heading straight at each waypoint")
+            if avoid and st.session_state.local_planner is None:
+                st.session_state.local_planner = DynamicWindowPlanner(st.session_state.environment)
+            elif not avoid:
+                st.session_state.local_planner = None
+            
+            # Realistic sensor readings instead of perfect ones
+            noisy = st.checkbox("Sensor Noise", value=st.session_state.sensor_noise is not None,
+                                help="Add range noise, angular jitter, dropouts and spurious returns to the LiDAR readings")
+            st.session_state.sensor_noise = SensorNoiseModel() if noisy else None
         
         # Explanation of the selected algorithm
         if st.session_state.control_mode == "Autonomous":
@@ -382,12 +574,90 @@ with main_col2:
                 **A* Algorithm**: A popular pathfinding algorithm that uses a heuristic to estimate the 
                 distance to the goal. It's efficient and will find the shortest path.
                 """)
+            elif st.session_state.algorithm == "Theta*":
+                st.info("""
+                **Theta* Algorithm**: An any-angle variant of A* that connects nodes by straight lines 
+                whenever they are visible to each other. It returns a few straight waypoints instead of 
+                a cell-by-cell path, so the vehicle makes fewer turns and stops.
+                """)
+            elif st.session_state.algorithm == "ALT A*":
+                st.info("""
+                **ALT A* Algorithm**: A* with a landmark heuristic. Path costs from a few far-apart 
+                landmarks are computed once per map and give, by the triangle inequality, a much tighter 
+                estimate around walls than the straight-line distance, so repeated searches on the same 
+                map expand far fewer cells.
+                """)
+            elif st.session_state.algorithm == "ARA*":
+                st.info(f"""
+                **ARA* Algorithm**: An anytime version of A* that quickly finds a path with an inflated 
+                heuristic and keeps improving it until its {PLANNING_TIME_BUDGET:.1f} s time budget runs out. 
+                It reports how far the path may be from the optimal one.
+                """)
+                if 'plan_bound' in st.session_state and st.session_state.path:
+                    st.caption(f"Current path is within {st.session_state.plan_bound:.2f}x of optimal.")
+            elif st.session_state.algorithm == "RRT*":
+                st.info(f"""
+                **RRT* Algorithm**: A sampling-based planner that grows a tree of random collision-free 
+                moves in continuous space and keeps rewiring it to shorten the path. Sampling is seeded 
+                and runs {RRT_ITERATIONS} iterations, so the same map gives the same path unless a very 
+                large map hits the {RRT_TIME_LIMIT:.0f} s time limit first.
+                """)
+            elif st.session_state.algorithm == "Hybrid A*":
+                st.info("""
+                **Hybrid A* Algorithm**: Searches over position and heading using short arcs the vehicle 
+                can actually drive with its turn rate and step size, so the vehicle follows the path 
+                without overshooting or oscillating around grid corners.
+                """)
+            elif st.session_state.algorithm == "Quadtree A*":
+                st.info("""
+                **Quadtree A* Algorithm**: Stores the map as a quadtree whose leaves are uniform blocks of 
+                free or blocked cells, and searches between free blocks instead of single cells. Large open 
+                maps need far fewer expansions than grid A*, at the cost of slightly longer paths.
+                """)
             else:
                 st.info("""
                 **Dijkstra's Algorithm**: A graph search algorithm that finds the shortest path from a 
                 starting node to all other nodes. It's slower than A* but guarantees the optimal path.
                 """)
     
+    # Save and restore the state of the run
+    with st.expander("Snapshots", expanded=False):
+        st.download_button(
+            "Save Snapshot",
+            data=encode_snapshot(st.session_state.environment, [st.session_state.vehicle],
+                                 [st.session_state.path], tick=st.session_state.time_elapsed,
+                                 telemetry_offset=len(st.session_state.telemetry)),
+            file_name=f"snapshot_{st.session_state.time_elapsed}.avsnap",
+            mime="application/octet-stream"
+        )
+        
+        snapshot_file = st.file_uploader("Snapshot file", type=["avsnap"])
+        if snapshot_file is not None and st.button("Restore Snapshot"):
+            try:
+                snapshot = decode_snapshot(snapshot_file.getvalue())
+            except Exception:
+                snapshot = None
+            if snapshot is None or snapshot["grid"].shape != st.session_state.environment.grid_size:
+                st.error("This file is not a snapshot of a map of this size.")
+            else:
+                st.session_state.is_running = False
+                st.session_state.planning_service.cancel()
+                st.session_state.plan_future = None
+                st.session_state.environment.load_map(snapshot["grid"])
+                
+                # Restore the vehicle, its path and the telemetry up to the snapshot
+                position, heading, velocity, path_index = snapshot["vehicles"][0]
+                st.session_state.vehicle.position = position
+                st.session_state.vehicle.heading = heading
+                st.session_state.vehicle.velocity = velocity
+                st.session_state.vehicle.path_index = path_index
+                if snapshot["vehicle_rng_states"][0] is not None:
+                    st.session_state.vehicle.rng.bit_generator.state = snapshot["vehicle_rng_states"][0]
+                st.session_state.path = snapshot["paths"][0]
+                st.session_state.telemetry = st.session_state.telemetry.iloc[:snapshot["telemetry_offset"]]
+                st.session_state.time_elapsed = snapshot["tick"]
+                st.rerun()
+    
     # Telemetry Display
     with st.expander("Telemetry", expanded=True):
         st.subheader("Vehicle Telemetry")
@@ -441,13 +711,6 @@ with main_col2:
         st.subheader("Sensor Readings")
         
         if st.session_state.control_mode == "Autonomous":
-            # Simulate LiDAR
-            lidar_points = simulate_lidar(st.session_state.vehicle.position, 
-                                      st.session_state.vehicle.heading, 
-                                      st.session_state.environment,
-                                      num_rays=12, 
-                                      max_range=5)
-            
             # Calculate distances
             if lidar_points:
                 distances = []
@@ -492,6 +755,26 @@ with main_col2:
                     st.success("✅ Path clear")
             else:
                 st.info("No sensor data available yet. Start the simulation.")
+            
+            # Depth image of the forward camera, nearer is brighter; one render
+            # feeds both the image and the detections
+            frame = DEPTH_CAMERA.render(st.session_state.vehicle.position,
+                                        st.session_state.vehicle.heading,
+                                        st.session_state.environment)
+            depth, labels = DEPTH_CAMERA.extrude(*frame)
+            fig_camera = go.Figure(go.Heatmap(z=np.where(np.isfinite(depth), depth, np.nan),
+                                              colorscale='gray', reversescale=True,
+                                              zmin=0, zmax=DEPTH_CAMERA.max_range,
+                                              colorbar=dict(title='Depth')))
+            fig_camera.update_layout(title="Camera Depth", height=250, margin=dict(l=10, r=10, t=40, b=10),
+                                     yaxis=dict(autorange='reversed', visible=False), xaxis=dict(visible=False))
+            st.plotly_chart(fig_camera, use_container_width=True)
+            
+            detections = DEPTH_CAMERA.detect(*frame, st.session_state.environment)
+            if detections:
+                nearest = detections[0]
+                st.caption(f"Camera: {len(detections)} obstacle(s) in view, nearest at "
+                           f"{nearest['distance']:.2f} units, {int(round(nearest['bearing'])):+d}° from heading")
         else:
             st.info("Sensor visualization is only available in Autonomous mode.")
 
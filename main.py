@@ -2,28 +2,47 @@
 # Dependencies: Install 'numpy' and 'opencv-python'
 
 import numpy as np
-import cv2
-import time
-import random
+
+from utils.camera import DepthCamera
+from utils.environment import Environment
 
 class SensorModule:
     """Simulates LiDAR-like distance sensing"""
+    def __init__(self, seed=None):
+        # Own generator, so seeded runs give the same readings
+        self.rng = np.random.default_rng(seed)
+
     def get_obstacle_distance(self):
         # Random distance in meters; simulate obstacle at random intervals
-        return random.uniform(0.5, 10.0)
+        return float(self.rng.uniform(0.5, 10.0))
+
+    def get_obstacle_distances(self, count):
+        # A whole scan of readings in one draw
+        return self.rng.uniform(0.5, 10.0, size=count)
 
 class CameraModule:
-    """Simulates object detection using a placeholder frame"""
-    def detect_objects(self):
-        print("Camera: Detecting objects ahead...")
-        time.sleep(0.5)
-        # Simulate detection of objects, with random detection probability
-        if random.random() < 0.3:
-            # 30% chance to detect a car or pedestrian
-            detected_objects = ["car", "pedestrian"]
-        else:
-            detected_objects = []
-        return detected_objects
+    """Detects objects in frames rendered by a depth camera"""
+    def __init__(self, environment=None, camera=None, position=(0, 0), heading=0):
+        self.environment = environment if environment is not None else Environment()
+        self.camera = camera if camera is not None else DepthCamera()
+        # Pose used when a frame is requested without one
+        self.position = position
+        self.heading = heading
+
+    def capture(self, position=None, heading=None):
+        # Full depth and label images, e.g. for display
+        position, heading = self._pose(position, heading)
+        return self.camera.render_image(position, heading, self.environment)
+
+    def detect_objects(self, position=None, heading=None):
+        # Detections come from the rendered frame: one per obstacle in view
+        position, heading = self._pose(position, heading)
+        depth, labels = self.camera.render(position, heading, self.environment)
+        return self.camera.detect(depth, labels, self.environment)
+
+    def _pose(self, position, heading):
+        return (self.position if position is None else position,
+                self.heading if heading is None else heading)
 
 class ControlModule:
     """Handles movement control decisions"""
@@ -46,6 +65,6 @@ class ControlModule:
         print("Emergency stop! Vehicle halted.")
 
 class AutonomousSystem:
-    def __init__(self):
-        self.sensor = SensorModule()
+    def __init__(self, seed=None):
+        self.sensor = SensorModule(seed)
 
@@ -0,0 +1,75 @@
+import numpy as np
+import os
+import tempfile
+import zipfile
+
+def cache_dir():
+    """
+    Return the directory used to persist precomputed tables between runs.
+    
+    The location can be overridden with the AV_SIM_CACHE_DIR environment
+    variable; by default it is ~/.cache/autonomous-vehicle-sim.
+    
+    Returns:
+        str: Path of the (created if needed) cache directory
+    """
+    path = os.environ.get("AV_SIM_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "autonomous-vehicle-sim")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def cache_path(name):
+    """
+    Return the path of a file in the cache directory.
+    
+    Args:
+        name (str): File name
+        
+    Returns:
+        str: Full path of the cache file
+    """
+    return os.path.join(cache_dir(), name)
+
+def save_arrays(path, compressed=False, **arrays):
+    """
+    Save arrays to an .npz file atomically: they are written to a temporary
+    file in the same directory and then moved into place, so readers never
+    see a partly written file, even if the writer crashes or several
+    processes write the same file at once.
+    
+    Args:
+        path (str): Destination path
+        compressed (bool): Whether to compress the arrays
+        **arrays: Arrays to save, by name
+    """
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".",
+                                         suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as file:
+            (np.savez_compressed if compressed else np.savez)(file, **arrays)
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+
+def load_arrays(path, *names):
+    """
+    Load arrays from an .npz file written by save_arrays().
+    
+    Args:
+        path (str): Path of the file
+        *names (str): Names of the arrays to load
+        
+    Returns:
+        dict: The arrays by name, or None if the file is missing, unreadable
+              (e.g. truncated) or lacks one of the arrays, so the caller can
+              treat it as a cache miss
+    """
+    try:
+        with np.load(path) as data:
+            return {name: data[name] for name in names}
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        return None
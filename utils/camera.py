@@ -0,0 +1,172 @@
+import numpy as np
+import math
+
+from utils.environment import segment_samples
+
+def obstacle_labels(environment):
+    """
+    Label the connected obstacles of a map (8-connected), computed with
+    OpenCV once per map content.
+
+    Args:
+        environment (Environment): The environment object containing obstacle information
+
+    Returns:
+        numpy.ndarray: Read-only int array of shape grid_size, 0 on free cells
+                       and 1..K for the cells of each obstacle
+    """
+    def build():
+        import cv2  # Only needed for camera rendering
+
+        _, labels = cv2.connectedComponents((np.asarray(environment.grid) == 1).astype(np.uint8), connectivity=8)
+        return labels
+    return environment.derived("obstacle_labels", build)
+
+class DepthCamera:
+    """
+    Forward-facing pinhole depth camera over the 2D grid world.
+
+    Every image column casts one ray through the grid with segment_samples,
+    all columns in a single batch, giving a 1-D depth and label row.
+    Obstacles are extruded to walls of a fixed height over a flat floor,
+    so the 2-D image follows from the row with array operations alone.
+    Depths are distances along the optical axis (no fisheye bending); np.inf
+    marks pixels with nothing within range. Labels identify the obstacle
+    seen (see obstacle_labels), 0 for floor, sky and the map boundary.
+    """
+
+    def __init__(self, fov=90, width=64, height=48, max_range=10, camera_height=0.5, wall_height=1.0):
+        """
+        Initialize the camera.
+
+        Args:
+            fov (float): Horizontal field of view in degrees
+            width (int): Image width in pixels (one ray per column)
+            height (int): Image height in pixels
+            max_range (float): Maximum ray length
+            camera_height (float): Height of the camera above the floor
+            wall_height (float): Height of the obstacles
+        """
+        self.fov = fov
+        self.width = width
+        self.height = height
+        self.max_range = max_range
+        self.camera_height = camera_height
+        self.wall_height = wall_height
+
+        # Pinhole geometry with square pixels: angle of every column from the
+        # optical axis (positive to the left) and slope of every row (positive up)
+        self.focal = (width / 2) / math.tan(math.radians(fov) / 2)
+        self.column_angles = -np.arctan((np.arange(width) + 0.5 - width / 2) / self.focal)
+        self.row_slopes = -(np.arange(height) + 0.5 - height / 2) / self.focal
+
+    def render(self, position, heading, environment):
+        """
+        Render the depth and label row seen from a pose.
+
+        Args:
+            position (tuple): Camera position (x, y)
+            heading (float): Viewing direction in degrees
+            environment (Environment): The environment object containing obstacle information
+
+        Returns:
+            tuple: (depth, labels), arrays of shape (width,)
+        """
+        # Cast one ray per column
+        angles = math.radians(heading) + self.column_angles
+        start = np.asarray(position, dtype=float)[:2]
+        ends = start + self.max_range * np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+        t, points, mask = segment_samples(np.broadcast_to(start, ends.shape), ends)
+
+        # Each ray stops at the first blocked piece (obstacle or outside the map)
+        blocked = mask & ~environment.are_valid_positions(points)
+        hit = blocked.any(axis=1)
+        first = blocked.argmax(axis=1)
+        columns = np.arange(self.width)
+        distance = np.where(hit, t[columns, first] * self.max_range, np.inf)
+        depth = distance * np.cos(self.column_angles)
+
+        # Label of the obstacle cell each ray stopped in
+        cells = np.rint(points[columns, first]).astype(np.int64)
+        inside = (cells[:, 0] >= 0) & (cells[:, 0] < environment.grid_size[0]) & \
+                 (cells[:, 1] >= 0) & (cells[:, 1] < environment.grid_size[1])
+        cells = np.clip(cells, 0, np.array(environment.grid_size) - 1)
+        labels = np.where(hit & inside, obstacle_labels(environment)[cells[:, 0], cells[:, 1]], 0)
+        return depth, labels
+
+    def render_image(self, position, heading, environment):
+        """
+        Render the 2-D depth and label images seen from a pose.
+
+        Args:
+            position (tuple): Camera position (x, y)
+            heading (float): Viewing direction in degrees
+            environment (Environment): The environment object containing obstacle information
+
+        Returns:
+            tuple: (depth, labels), arrays of shape (height, width)
+        """
+        return self.extrude(*self.render(position, heading, environment))
+
+    def extrude(self, depth_row, label_row):
+        """
+        Turn a rendered row into 2-D depth and label images, so one render()
+        can feed both the images and detect().
+
+        Args:
+            depth_row (numpy.ndarray): Depth row from render()
+            label_row (numpy.ndarray): Label row from render()
+
+        Returns:
+            tuple: (depth, labels), arrays of shape (height, width)
+        """
+        slopes = self.row_slopes[:, None]
+
+        # Rows looking down see the floor where it is closer than the wall
+        with np.errstate(divide='ignore'):
+            floor = np.where(slopes < 0, self.camera_height / -slopes, np.inf)
+        on_floor = floor < depth_row[None, :]
+
+        # The wall spans the rows between its foot and its top
+        on_wall = ~on_floor & np.isfinite(depth_row)[None, :] & \
+                  (slopes * depth_row[None, :] <= self.wall_height - self.camera_height)
+
+        depth = np.where(on_wall, depth_row[None, :], np.where(on_floor & (floor <= self.max_range), floor, np.inf))
+        labels = np.where(on_wall, label_row[None, :], 0)
+        return depth, labels
+
+    def detect(self, depth, labels, environment):
+        """
+        List the obstacles visible in a rendered row.
+
+        Args:
+            depth (numpy.ndarray): Depth row from render()
+            labels (numpy.ndarray): Label row from render()
+            environment (Environment): The environment the row was rendered in
+
+        Returns:
+            list: One dict per visible obstacle, nearest first, with its label,
+                  distance, bearing (degrees from the viewing direction,
+                  positive to the left), first and last image column and
+                  size in cells
+        """
+        visible = labels > 0
+        if not visible.any():
+            return []
+
+        # Group the visible columns by obstacle
+        ids, group = np.unique(labels[visible], return_inverse=True)
+        columns = np.nonzero(visible)[0]
+        nearest = np.full(len(ids), np.inf)
+        np.minimum.at(nearest, group, depth[visible])
+        first = np.full(len(ids), self.width)
+        np.minimum.at(first, group, columns)
+        last = np.zeros(len(ids), dtype=int)
+        np.maximum.at(last, group, columns)
+        bearing = np.degrees(np.bincount(group, self.column_angles[columns]) / np.bincount(group))
+        sizes = environment.derived("obstacle_sizes", lambda: np.bincount(obstacle_labels(environment).ravel()))
+
+        detections = [{"label": int(ids[i]), "distance": float(nearest[i]), "bearing": float(bearing[i]),
+                       "columns": (int(first[i]), int(last[i])), "size": int(sizes[ids[i]])}
+                      for i in range(len(ids))]
+        return sorted(detections, key=lambda detection: detection["distance"])
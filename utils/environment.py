@@ -1,5 +1,242 @@
 import numpy as np
+import hashlib
 import random
+import threading
+from collections import OrderedDict
+
+# Structures derived from a grid (distance fields, planner tables, ...),
+# shared by every environment in the process with the same map content.
+# Keyed by (fingerprint, name) and evicted least recently used first.
+DERIVED_CACHE_BYTES = 256 * 1024 * 1024
+_derived_cache = OrderedDict()
+_derived_cache_bytes = 0
+_derived_cache_lock = threading.Lock()
+
+# Largest share of the grid an incremental distance field refresh may
+# recompute; beyond it a full distance transform is faster
+INCREMENTAL_FIELD_FRACTION = 0.25
+
+
+def segment_samples(starts, ends):
+    """
+    Traverse the grid cells crossed by a batch of straight segments.
+    
+    Cells are centred on integer coordinates, so every segment is split at
+    the half-integer cell boundaries it crosses. One sample point is taken
+    in the middle of each piece, which is enough to identify every cell the
+    segment passes through. Rows are padded to a common length; padded or
+    zero-length pieces are flagged in the returned mask.
+    
+    Args:
+        starts (numpy.ndarray): Segment start points, shape (N, 2)
+        ends (numpy.ndarray): Segment end points, shape (N, 2)
+        
+    Returns:
+        tuple: (t, points, mask) where t (N, M) is the segment parameter at
+               which each piece is entered, points (N, M, 2) are the sample
+               points and mask (N, M) is True for pieces of non-zero length
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+    delta = ends - starts
+    
+    # A segment crosses at most ceil(|d|) + 1 boundaries along each axis
+    span = np.abs(delta).max() if len(delta) else 0.0
+    steps = np.arange(int(np.ceil(span)) + 1)
+    
+    crossings = []
+    for axis in range(2):
+        d = delta[:, axis, None]
+        sign = np.sign(d)
+        first = np.floor(starts[:, axis, None] + 0.5) + 0.5 * sign
+        boundaries = first + sign * steps
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_axis = (boundaries - starts[:, axis, None]) / d
+        # Crossings outside the segment (or along a zero-length axis) are
+        # pushed to the end point so they collapse into padding
+        t_axis = np.where((t_axis > 0) & (t_axis < 1), t_axis, 1.0)
+        crossings.append(t_axis)
+    
+    n = len(starts)
+    t = np.concatenate([np.zeros((n, 1)), crossings[0], crossings[1], np.ones((n, 1))], axis=1)
+    t.sort(axis=1)
+    
+    t_entry = t[:, :-1]
+    mask = t[:, 1:] > t_entry
+    midpoints = 0.5 * (t_entry + t[:, 1:])
+    points = starts[:, None, :] + midpoints[..., None] * delta[:, None, :]
+    return t_entry, points, mask
+
+
+def rasterize_rectangle(corner, opposite):
+    """
+    Rasterize an axis-aligned rectangle given by two opposite corner cells.
+    
+    Args:
+        corner (tuple): Corner cell (x, y)
+        opposite (tuple): Opposite corner cell (x, y), included in the rectangle
+        
+    Returns:
+        tuple: (mask, origin) where mask is a boolean window and origin the
+               cell of its first element
+    """
+    lo = np.rint(np.minimum(corner[:2], opposite[:2])).astype(int)
+    hi = np.rint(np.maximum(corner[:2], opposite[:2])).astype(int)
+    return np.ones(hi - lo + 1, dtype=bool), (int(lo[0]), int(lo[1]))
+
+def rasterize_cells(cells):
+    """
+    Rasterize a batch of cells into one window.
+    
+    Args:
+        cells (list): Positions (x, y), truncated to cells like Environment.add_obstacle
+        
+    Returns:
+        tuple: (mask, origin) where mask is a boolean window and origin the
+               cell of its first element
+    """
+    cells = np.asarray(cells, dtype=float).reshape(-1, 2).astype(int)
+    lo = cells.min(axis=0)
+    mask = np.zeros(cells.max(axis=0) - lo + 1, dtype=bool)
+    mask[cells[:, 0] - lo[0], cells[:, 1] - lo[1]] = True
+    return mask, (int(lo[0]), int(lo[1]))
+
+def _segment_cells(starts, ends, lo, shape):
+    """
+    Mask of the cells crossed by a batch of segments within a window.
+    """
+    _, points, mask = segment_samples(starts, ends)
+    cells = np.rint(points[mask]).astype(int) - lo
+    inside = np.all((cells >= 0) & (cells < shape), axis=1)
+    crossed = np.zeros(shape, dtype=bool)
+    crossed[cells[inside, 0], cells[inside, 1]] = True
+    return crossed
+
+def rasterize_polygon(vertices):
+    """
+    Rasterize a polygon: every cell whose centre is inside it (even-odd
+    rule), plus every cell its edges cross, so thin shapes stay connected.
+    
+    Args:
+        vertices (list): Polygon corners (x, y) in order
+        
+    Returns:
+        tuple: (mask, origin) where mask is a boolean window and origin the
+               cell of its first element
+    """
+    vertices = np.asarray(vertices, dtype=float).reshape(-1, 2)
+    lo = np.floor(vertices.min(axis=0) + 0.5).astype(int)
+    hi = np.floor(vertices.max(axis=0) + 0.5).astype(int)
+    shape = tuple(hi - lo + 1)
+    x = (lo[0] + np.arange(shape[0]))[:, None]
+    y = (lo[1] + np.arange(shape[1]))[None, :]
+    
+    # Crossing-number test for all cell centres at once, one edge at a time
+    inside = np.zeros(shape, dtype=bool)
+    starts, ends = vertices, np.roll(vertices, -1, axis=0)
+    for (x0, y0), (x1, y1) in zip(starts, ends):
+        if y0 == y1:
+            continue
+        spans = (y0 > y) != (y1 > y)
+        crossing = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+        inside ^= spans & (x < crossing)
+    
+    return inside | _segment_cells(starts, ends, lo, shape), (int(lo[0]), int(lo[1]))
+
+def rasterize_wall(start, end, thickness=1.0):
+    """
+    Rasterize a straight wall: every cell whose centre is within half the
+    thickness of the segment, plus every cell the segment crosses.
+    
+    Args:
+        start (tuple): Start point (x, y)
+        end (tuple): End point (x, y)
+        thickness (float): Wall thickness in cells
+        
+    Returns:
+        tuple: (mask, origin) where mask is a boolean window and origin the
+               cell of its first element
+    """
+    start = np.asarray(start, dtype=float)[:2]
+    end = np.asarray(end, dtype=float)[:2]
+    half = thickness / 2
+    lo = np.floor(np.minimum(start, end) - half + 0.5).astype(int)
+    hi = np.floor(np.maximum(start, end) + half + 0.5).astype(int)
+    shape = tuple(hi - lo + 1)
+    
+    # Distance from every cell centre in the window to the segment
+    centres = np.stack(np.meshgrid(lo[0] + np.arange(shape[0]), lo[1] + np.arange(shape[1]),
+                                   indexing='ij'), axis=-1).astype(float)
+    delta = end - start
+    length_sq = float(delta @ delta)
+    t = np.clip((centres - start) @ delta / length_sq, 0, 1) if length_sq > 0 else np.zeros(shape)
+    distance = np.linalg.norm(centres - (start + t[..., None] * delta), axis=-1)
+    
+    return (distance <= half) | _segment_cells([start], [end], lo, shape), (int(lo[0]), int(lo[1]))
+
+
+def _segment_box_distance(starts, ends, centres):
+    """
+    Distance from each segment to the unit cell square around a centre,
+    for segments that do not cross the square. Between a segment and a
+    square the nearest points include an endpoint or a corner, so the
+    distance is the least of the endpoint-square and corner-segment distances.
+    """
+    def point_box(points):
+        gap = np.maximum(np.abs(points - centres) - 0.5, 0)
+        return np.hypot(gap[:, 0], gap[:, 1])
+    
+    delta = ends - starts
+    length2 = np.maximum((delta ** 2).sum(axis=1), 1e-12)
+    distance = np.minimum(point_box(starts), point_box(ends))
+    for corner in ((-0.5, -0.5), (-0.5, 0.5), (0.5, -0.5), (0.5, 0.5)):
+        offset = centres + corner - starts
+        t = np.clip((offset * delta).sum(axis=1) / length2, 0, 1)
+        closest = offset - t[:, None] * delta
+        distance = np.minimum(distance, np.hypot(closest[:, 0], closest[:, 1]))
+    return distance
+
+class ChangeEvent:
+    """
+    One edit of an environment's obstacles. Every edit sends a single event
+    to the subscribers, however many cells it changed, with the bounding box
+    of the changed cells so caches can refresh just that region.
+    """
+    
+    def __init__(self, version, lo, hi, cells=None):
+        """
+        Initialize the event.
+        
+        Args:
+            version (int): Map version after the edit
+            lo (tuple): Lowest corner (x, y) of the changed cells
+            hi (tuple): Highest corner (x, y) of the changed cells, inclusive
+            cells (int): Number of cells changed, or None if unknown
+        """
+        self.version = version
+        self.lo = lo
+        self.hi = hi
+        self.cells = cells
+        
+    def segments_near(self, starts, ends):
+        """
+        Find the segments whose bounding box touches the changed cells, the
+        only ones whose line of sight the edit can have changed.
+        
+        Args:
+            starts (numpy.ndarray): Segment start points, shape (N, 2)
+            ends (numpy.ndarray): Segment end points, shape (N, 2)
+            
+        Returns:
+            numpy.ndarray: Boolean array of shape (N,)
+        """
+        starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+        # Cells cover half a unit around their centre
+        lo = np.asarray(self.lo) - 0.5
+        hi = np.asarray(self.hi) + 0.5
+        return np.all((np.maximum(starts, ends) >= lo) & (np.minimum(starts, ends) <= hi), axis=1)
+
 
 class Environment:
     """
@@ -15,6 +252,20 @@ class Environment:
         """
         self.grid_size = grid_size
         self.grid = np.zeros(grid_size, dtype=int)  # 0 = free space, 1 = obstacle
+        self.version = 0  # Incremented on every map change
+        self._fingerprint = None  # (version, fingerprint) cache for fingerprint()
+        self._subscribers = []  # Callbacks receiving a ChangeEvent after every edit
+        self._field_base = None  # (version, field) of the last distance field returned
+        self._dirty = None  # (edits, lo, hi) of the changes since that field
+        self._loaded_version = 0  # Version of the last whole-map load; later changes are edits
+        
+    @property
+    def edited(self):
+        """
+        True if the map was changed since it was created or last loaded whole
+        with load_map(), i.e. it only exists because of in-session edits.
+        """
+        return self.version != self._loaded_version
         
     def add_obstacle(self, position):
         """
@@ -25,7 +276,8 @@ class Environment:
         """
         x, y = int(position[0]), int(position[1])
         if 0 <= x < self.grid_size[0] and 0 <= y < self.grid_size[1]:
-            self.grid[x, y] = 1
+            self._writable_grid()[x, y] = 1
+            self._changed((x, y), (x, y), 1)
             
     def remove_obstacle(self, position):
         """
@@ -36,13 +288,234 @@ class Environment:
         """
         x, y = int(position[0]), int(position[1])
         if 0 <= x < self.grid_size[0] and 0 <= y < self.grid_size[1]:
-            self.grid[x, y] = 0
+            self._writable_grid()[x, y] = 0
+            self._changed((x, y), (x, y), 1)
             
+    def _writable_grid(self):
+        """
+        Return the grid for editing. Grids shared with copies are read-only,
+        so the first edit after sharing copies the grid (copy-on-write).
+        """
+        if not self.grid.flags.writeable:
+            self.grid = self.grid.copy()
+        return self.grid
+        
     def clear_obstacles(self):
         """
         Remove all obstacles from the grid.
         """
         self.grid = np.zeros(self.grid_size, dtype=int)
+        self._changed((0, 0), (self.grid_size[0] - 1, self.grid_size[1] - 1))
+        
+    def subscribe(self, callback):
+        """
+        Register a function called with a ChangeEvent after every edit.
+        
+        Args:
+            callback (callable): Function taking a ChangeEvent
+        """
+        self._subscribers.append(callback)
+        
+    def unsubscribe(self, callback):
+        """
+        Stop calling a function registered with subscribe().
+        
+        Args:
+            callback (callable): Function passed to subscribe()
+        """
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+            
+    def _changed(self, lo, hi, cells=None):
+        """
+        Record an edit of the cells lo..hi (inclusive): bump the version, grow
+        the region the distance field must refresh and notify subscribers.
+        
+        Returns:
+            ChangeEvent: The event sent to the subscribers
+        """
+        self.version += 1
+        if self._dirty is None:
+            self._dirty = (1, tuple(lo), tuple(hi))
+        else:
+            edits, dirty_lo, dirty_hi = self._dirty
+            self._dirty = (edits + 1, (min(lo[0], dirty_lo[0]), min(lo[1], dirty_lo[1])),
+                           (max(hi[0], dirty_hi[0]), max(hi[1], dirty_hi[1])))
+        
+        event = ChangeEvent(self.version, tuple(lo), tuple(hi), cells)
+        for callback in list(self._subscribers):
+            callback(event)
+        return event
+        
+    def _write_cells(self, origin, changed, obstacles):
+        """
+        Write obstacle values into the cells flagged in a window of the grid.
+        
+        Args:
+            origin (tuple): Grid cell of the window's first element
+            changed (numpy.ndarray): Boolean window of the cells to write
+            obstacles (numpy.ndarray): Boolean window, True where the cell becomes an obstacle
+        """
+        x0, y0 = origin
+        window = self._writable_grid()[x0:x0 + changed.shape[0], y0:y0 + changed.shape[1]]
+        window[changed] = obstacles[changed]
+        
+    def _assign(self, mask, origin, obstacles):
+        """
+        Set the cells selected by a mask window to obstacle or free in one
+        operation, with a single version bump and change event.
+        
+        Args:
+            mask (numpy.ndarray): Boolean window, True for the cells to set
+            origin (tuple): Grid cell (x, y) of the window's first element
+            obstacles (bool or numpy.ndarray): New state of the cells, or a window
+                                               of the mask's shape with one per cell
+        
+        Returns:
+            ChangeEvent: The event of the edit, or None if no cell changed
+        """
+        mask = np.asarray(mask, dtype=bool)
+        x0, y0 = int(origin[0]), int(origin[1])
+        
+        # Clip the window to the grid
+        cx0, cy0 = max(x0, 0), max(y0, 0)
+        cx1 = min(x0 + mask.shape[0], self.grid_size[0])
+        cy1 = min(y0 + mask.shape[1], self.grid_size[1])
+        if cx0 >= cx1 or cy0 >= cy1:
+            return None
+        window = (slice(cx0 - x0, cx1 - x0), slice(cy0 - y0, cy1 - y0))
+        obstacles = np.asarray(obstacles, dtype=bool)
+        obstacles = obstacles[window] if obstacles.ndim else np.full(mask[window].shape, bool(obstacles))
+        mask = mask[window]
+        
+        # Only cells whose state actually changes are written and reported
+        changed = mask & (self._occupancy_window((cx0, cy0), (cx1 - 1, cy1 - 1)) != obstacles)
+        if not changed.any():
+            return None
+        rows = np.flatnonzero(changed.any(axis=1))
+        cols = np.flatnonzero(changed.any(axis=0))
+        self._write_cells((cx0, cy0), changed, obstacles)
+        return self._changed((cx0 + int(rows[0]), cy0 + int(cols[0])),
+                             (cx0 + int(rows[-1]), cy0 + int(cols[-1])), int(changed.sum()))
+        
+    def fill_mask(self, mask, origin=(0, 0), value=1):
+        """
+        Set every cell selected by a boolean mask in one edit.
+        
+        Args:
+            mask (numpy.ndarray): Boolean window, True for the cells to set
+            origin (tuple): Grid cell (x, y) of the window's first element
+            value (int): 1 to add obstacles, 0 to remove them
+            
+        Returns:
+            ChangeEvent: The event of the edit, or None if no cell changed
+        """
+        return self._assign(mask, origin, bool(value == 1))
+        
+    def fill_cells(self, cells, value=1):
+        """
+        Set a batch of cells in one edit. Cells outside the grid are ignored.
+        
+        Args:
+            cells (list): Positions (x, y)
+            value (int): 1 to add obstacles, 0 to remove them
+            
+        Returns:
+            ChangeEvent: The event of the edit, or None if no cell changed
+        """
+        if len(cells) == 0:
+            return None
+        return self.fill_mask(*rasterize_cells(cells), value)
+        
+    def fill_rectangle(self, corner, opposite, value=1):
+        """
+        Set an axis-aligned rectangle of cells (corners included) in one edit.
+        
+        Args:
+            corner (tuple): Corner cell (x, y)
+            opposite (tuple): Opposite corner cell (x, y)
+            value (int): 1 to add obstacles, 0 to remove them
+            
+        Returns:
+            ChangeEvent: The event of the edit, or None if no cell changed
+        """
+        return self.fill_mask(*rasterize_rectangle(corner, opposite), value)
+        
+    def fill_polygon(self, vertices, value=1):
+        """
+        Set the cells of a polygon in one edit (see rasterize_polygon).
+        
+        Args:
+            vertices (list): Polygon corners (x, y) in order
+            value (int): 1 to add obstacles, 0 to remove them
+            
+        Returns:
+            ChangeEvent: The event of the edit, or None if no cell changed
+        """
+        return self.fill_mask(*rasterize_polygon(vertices), value)
+        
+    def fill_wall(self, start, end, thickness=1.0, value=1):
+        """
+        Set the cells of a straight wall in one edit (see rasterize_wall).
+        
+        Args:
+            start (tuple): Start point (x, y)
+            end (tuple): End point (x, y)
+            thickness (float): Wall thickness in cells
+            value (int): 1 to add obstacles, 0 to remove them
+            
+        Returns:
+            ChangeEvent: The event of the edit, or None if no cell changed
+        """
+        return self.fill_mask(*rasterize_wall(start, end, thickness), value)
+        
+    def load_layout(self, shapes, clear=True):
+        """
+        Build a site layout from shapes in a single edit.
+        
+        Each shape is a dict with a "type" and its parameters:
+        {"type": "rectangle", "corner": (x, y), "opposite": (x, y)},
+        {"type": "polygon", "vertices": [(x, y), ...]},
+        {"type": "wall", "start": (x, y), "end": (x, y), "thickness": 1.0},
+        {"type": "cells", "cells": [(x, y), ...]} or
+        {"type": "mask", "mask": array, "origin": (x, y)}.
+        
+        Args:
+            shapes (list): Shapes to turn into obstacles
+            clear (bool): Whether to remove all other obstacles first
+            
+        Returns:
+            ChangeEvent: The event of the edit, or None if no cell changed
+        """
+        layout = np.zeros(self.grid_size, dtype=bool)
+        for shape in shapes:
+            kind = shape["type"]
+            if kind == "rectangle":
+                mask, origin = rasterize_rectangle(shape["corner"], shape["opposite"])
+            elif kind == "polygon":
+                mask, origin = rasterize_polygon(shape["vertices"])
+            elif kind == "wall":
+                mask, origin = rasterize_wall(shape["start"], shape["end"], shape.get("thickness", 1.0))
+            elif kind == "cells":
+                if len(shape["cells"]) == 0:
+                    continue
+                mask, origin = rasterize_cells(shape["cells"])
+            elif kind == "mask":
+                mask, origin = np.asarray(shape["mask"], dtype=bool), shape.get("origin", (0, 0))
+            else:
+                raise ValueError(f"Unknown shape type: {kind}")
+            
+            # Paste the shape's window into the layout, clipped to the grid
+            x0, y0 = int(origin[0]), int(origin[1])
+            cx0, cy0 = max(x0, 0), max(y0, 0)
+            cx1 = min(x0 + mask.shape[0], self.grid_size[0])
+            cy1 = min(y0 + mask.shape[1], self.grid_size[1])
+            if cx0 < cx1 and cy0 < cy1:
+                layout[cx0:cx1, cy0:cy1] |= mask[cx0 - x0:cx1 - x0, cy0 - y0:cy1 - y0]
+        
+        if clear:
+            return self._assign(np.ones(self.grid_size, dtype=bool), (0, 0), layout)
+        return self.fill_mask(layout)
         
     def is_valid_position(self, position):
         """
@@ -65,6 +538,296 @@ class Environment:
             return False
         
         return True
+    
+    def are_valid_positions(self, positions):
+        """
+        Vectorised version of is_valid_position for an array of points.
+        
+        Args:
+            positions (numpy.ndarray): Points to check, shape (..., 2)
+            
+        Returns:
+            numpy.ndarray: Boolean array of shape (...), True where valid
+        """
+        positions = np.asarray(positions, dtype=float)
+        cells = np.rint(positions).astype(int)
+        x, y = cells[..., 0], cells[..., 1]
+        
+        # Check if positions are within bounds
+        inside = (x >= 0) & (x < self.grid_size[0]) & (y >= 0) & (y < self.grid_size[1])
+        
+        # Check if positions contain an obstacle (out of bounds cells are clamped
+        # for the lookup and then rejected by the bounds mask)
+        xc = np.clip(x, 0, self.grid_size[0] - 1)
+        yc = np.clip(y, 0, self.grid_size[1] - 1)
+        return inside & (self.grid[xc, yc] != 1)
+    
+    def segments_clear(self, starts, ends):
+        """
+        Check line of sight for a batch of straight segments.
+        
+        Args:
+            starts (numpy.ndarray): Segment start points, shape (N, 2)
+            ends (numpy.ndarray): Segment end points, shape (N, 2)
+            
+        Returns:
+            numpy.ndarray: Boolean array of shape (N,), True where every cell
+                           crossed by the segment is valid
+        """
+        _, points, mask = segment_samples(starts, ends)
+        valid = self.are_valid_positions(points)
+        return np.all(valid | ~mask, axis=1)
+    
+    def has_line_of_sight(self, start, end):
+        """
+        Check line of sight between two points.
+        
+        Args:
+            start (tuple): Start position (x, y)
+            end (tuple): End position (x, y)
+            
+        Returns:
+            bool: True if the straight segment only crosses valid cells
+        """
+        return bool(self.segments_clear([start[:2]], [end[:2]])[0])
+    
+    def sweeps_collide(self, start_poses, end_poses, radius=0.0):
+        """
+        Check whether a circular footprint collides while moving in a straight
+        line between two poses, for a batch of moves.
+        
+        A move collides when it crosses an obstacle cell (or leaves the map)
+        or passes closer than `radius` to one: distances are measured from
+        the swept segment to the nearest point of each obstacle cell's square.
+        
+        Args:
+            start_poses (numpy.ndarray): Start poses, shape (N, 2) or (N, 3);
+                                         headings are ignored for a circular footprint
+            end_poses (numpy.ndarray): End poses, same shape as start_poses
+            radius (float): Footprint radius
+            
+        Returns:
+            numpy.ndarray: Boolean array of shape (N,), True where the move collides
+        """
+        start_poses = np.asarray(start_poses, dtype=float)
+        end_poses = np.asarray(end_poses, dtype=float)
+        starts = start_poses.reshape(-1, start_poses.shape[-1])[:, :2]
+        ends = end_poses.reshape(-1, end_poses.shape[-1])[:, :2]
+        if len(starts) == 0:
+            return np.zeros(0, dtype=bool)
+        if radius <= 0:
+            return ~self.segments_clear(starts, ends)
+        
+        _, points, mask = segment_samples(starts, ends)
+        cells = np.rint(points).astype(int)
+        
+        # Obstacles only matter inside the window touched by the sweeps
+        margin = int(np.ceil(radius)) + 1
+        lo = cells.reshape(-1, 2).min(axis=0) - margin
+        hi = cells.reshape(-1, 2).max(axis=0) + margin
+        blocked = self._occupancy_window(lo, hi)
+        local = cells - lo
+        
+        # Moves crossing an obstacle cell
+        collides = np.any(blocked[local[..., 0], local[..., 1]] & mask, axis=1)
+        
+        # Obstacle cells near the crossed cells; the segment is within half a
+        # cell of every crossed cell's centre, so margin cells reach any
+        # obstacle closer than radius
+        for dx in range(-margin, margin + 1):
+            for dy in range(-margin, margin + 1):
+                if np.hypot(max(abs(dx) - 1, 0), max(abs(dy) - 1, 0)) >= radius:
+                    continue
+                near = mask & blocked[local[..., 0] + dx, local[..., 1] + dy] & ~collides[:, None]
+                moves, pieces = np.nonzero(near)
+                if len(moves) == 0:
+                    continue
+                centres = cells[moves, pieces] + (dx, dy)
+                gaps = _segment_box_distance(starts[moves], ends[moves], centres)
+                np.logical_or.at(collides, moves[gaps < radius], True)
+        return collides
+    
+    def fingerprint(self):
+        """
+        Content hash of the map, computed once per map version. Environments
+        with the same obstacles have the same fingerprint, whatever their
+        version or history.
+        
+        Returns:
+            str: Fingerprint of the grid size and obstacle layout
+        """
+        if self._fingerprint is None or self._fingerprint[0] != self.version:
+            digest = hashlib.blake2b(np.packbits(self.grid == 1).tobytes(), digest_size=16).hexdigest()
+            self._fingerprint = (self.version, f"{self.grid_size[0]}x{self.grid_size[1]}-{digest}")
+        return self._fingerprint[1]
+    
+    def derived(self, name, build):
+        """
+        Return a structure derived from the map, building it only once per
+        map content in this process. Arrays are returned read-only since
+        every environment with the same map shares them.
+        
+        Args:
+            name (hashable): Name of the structure, unique per way of building it
+            build (callable): Function that builds the structure from this environment
+            
+        Returns:
+            object: The cached or newly built structure
+        """
+        global _derived_cache_bytes
+        key = (self.fingerprint(), name)
+        with _derived_cache_lock:
+            if key in _derived_cache:
+                _derived_cache.move_to_end(key)
+                return _derived_cache[key]
+        
+        value = build()
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+        
+        with _derived_cache_lock:
+            if key not in _derived_cache:
+                _derived_cache[key] = value
+                _derived_cache_bytes += getattr(value, "nbytes", 0)
+                # Evict the least recently used structures over the memory budget
+                while _derived_cache_bytes > DERIVED_CACHE_BYTES and len(_derived_cache) > 1:
+                    _, evicted = _derived_cache.popitem(last=False)
+                    _derived_cache_bytes -= getattr(evicted, "nbytes", 0)
+            return _derived_cache[key]
+    
+    def distance_field(self):
+        """
+        Distance from every cell to the nearest obstacle or to the outside of
+        the grid, computed once per map content. After edits, only the cells
+        whose nearest obstacle may have changed are recomputed from the
+        previous field (see _refresh_distance_field).
+        
+        Returns:
+            numpy.ndarray: Read-only float array of shape grid_size with
+                           Euclidean distances in cells (0 on obstacles)
+        """
+        def build():
+            field = self._refresh_distance_field()
+            if field is not None:
+                return field
+            return self._distance_window((0, 0), (self.grid_size[0] - 1, self.grid_size[1] - 1))
+        field = self.derived("distance_field", build)
+        self._field_base = (self.version, field)
+        self._dirty = None
+        return field
+    
+    def _distance_window(self, lo, hi):
+        """
+        Distance transform of the cells lo..hi (inclusive). The outside of the
+        grid counts as an obstacle; the rest of the grid beyond the window is
+        ignored, so distances are exact only where the nearest obstacle is
+        closer than the window's edge.
+        """
+        import cv2  # Only needed for distance fields
+        
+        # Pad the window with a ring that is an obstacle where it stands for
+        # the outside of the grid and free where it stands for more grid
+        free = np.ones((hi[0] - lo[0] + 3, hi[1] - lo[1] + 3), dtype=np.uint8)
+        free[1:-1, 1:-1] = ~self._occupancy_window(lo, hi)
+        if lo[0] == 0:
+            free[0, :] = 0
+        if lo[1] == 0:
+            free[:, 0] = 0
+        if hi[0] == self.grid_size[0] - 1:
+            free[-1, :] = 0
+        if hi[1] == self.grid_size[1] - 1:
+            free[:, -1] = 0
+        field = cv2.distanceTransform(free, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+        return field[1:-1, 1:-1].copy()
+    
+    def _refresh_distance_field(self):
+        """
+        Update the last distance field for the edits made since, recomputing
+        only a window around the changed cells.
+        
+        A cell's distance can only change if the changed region is no farther
+        than its old distance, so only those cells are updated. They are
+        recomputed in a window grown until each of them is closer to an
+        obstacle than to the window's edge, which makes the result exact.
+        On open maps the cells near the edit are far from any obstacle, so
+        the window would cover most of the grid; once it would exceed
+        INCREMENTAL_FIELD_FRACTION of the grid, the full transform is used.
+        
+        Returns:
+            numpy.ndarray: The updated field, or None if it has to be computed
+                           from scratch (no previous field, untracked edits,
+                           or too large a region to refresh)
+        """
+        if self._field_base is None or self._dirty is None:
+            return None
+        base_version, base = self._field_base
+        edits, dirty_lo, dirty_hi = self._dirty
+        if base_version + edits != self.version:
+            return None
+        
+        def too_large(lo, hi):
+            return np.prod(np.asarray(hi) - lo + 1) > INCREMENTAL_FIELD_FRACTION * np.prod(self.grid_size)
+        
+        # Cells no farther from the changed region than from their old nearest obstacle
+        reach = int(np.ceil(base.max()))
+        lo = np.maximum(np.array(dirty_lo) - reach, 0)
+        hi = np.minimum(np.array(dirty_hi) + reach, np.array(self.grid_size) - 1)
+        if too_large(lo, hi):
+            return None
+        x = np.arange(lo[0], hi[0] + 1)[:, None]
+        y = np.arange(lo[1], hi[1] + 1)[None, :]
+        gap = np.hypot(np.maximum(np.maximum(dirty_lo[0] - x, x - dirty_hi[0]), 0),
+                       np.maximum(np.maximum(dirty_lo[1] - y, y - dirty_hi[1]), 0))
+        affected = gap <= base[lo[0]:hi[0] + 1, lo[1]:hi[1] + 1] + 1e-3
+        if not affected.any():
+            return base
+        
+        xs, ys = np.nonzero(affected)
+        affected_lo = lo + np.array([xs.min(), ys.min()])
+        affected_hi = lo + np.array([xs.max(), ys.max()])
+        cells = np.stack([xs, ys], axis=1) + lo
+        margin = int(np.ceil(base[cells[:, 0], cells[:, 1]].max())) + 1
+        
+        while True:
+            window_lo = np.maximum(affected_lo - margin, 0)
+            window_hi = np.minimum(affected_hi + margin, np.array(self.grid_size) - 1)
+            if too_large(window_lo, window_hi):
+                return None
+            window = self._distance_window(window_lo, window_hi)
+            local = cells - window_lo
+            values = window[local[:, 0], local[:, 1]]
+            
+            # Distance from each cell to the nearest grid cell outside the window
+            edge = np.full(len(cells), np.inf)
+            if window_lo[0] > 0:
+                edge = np.minimum(edge, local[:, 0] + 1)
+            if window_lo[1] > 0:
+                edge = np.minimum(edge, local[:, 1] + 1)
+            if window_hi[0] < self.grid_size[0] - 1:
+                edge = np.minimum(edge, window_hi[0] - cells[:, 0] + 1)
+            if window_hi[1] < self.grid_size[1] - 1:
+                edge = np.minimum(edge, window_hi[1] - cells[:, 1] + 1)
+            if np.all(values <= edge):
+                break
+            margin *= 2
+        
+        field = base.copy()
+        field[cells[:, 0], cells[:, 1]] = values
+        return field
+    
+    def _occupancy_window(self, lo, hi):
+        """
+        Return a boolean obstacle mask for the cells lo..hi (inclusive), with
+        cells outside the grid marked as blocked.
+        """
+        window = np.ones((hi[0] - lo[0] + 1, hi[1] - lo[1] + 1), dtype=bool)
+        x0, y0 = max(lo[0], 0), max(lo[1], 0)
+        x1 = min(hi[0], self.grid_size[0] - 1)
+        y1 = min(hi[1], self.grid_size[1] - 1)
+        if x0 <= x1 and y0 <= y1:
+            window[x0 - lo[0]:x1 - lo[0] + 1, y0 - lo[1]:y1 - lo[1] + 1] = \
+                self.grid[x0:x1 + 1, y0:y1 + 1] == 1
+        return window
         
     def generate_random_obstacles(self, count=10, exclude=None):
         """
@@ -81,6 +844,7 @@ class Environment:
         exclude_positions = [(int(pos[0]), int(pos[1])) for pos in exclude]
         
         # Generate random obstacles
+        cells = []
         for _ in range(count):
             x = random.randint(0, self.grid_size[0] - 1)
             y = random.randint(0, self.grid_size[1] - 1)
@@ -89,7 +853,10 @@ class Environment:
             if (x, y) in exclude_positions:
                 continue
                 
-            self.add_obstacle((x, y))
+            cells.append((x, y))
+        
+        # Add them all in one edit
+        self.fill_cells(cells)
             
     def load_map(self, map_data):
         """
@@ -100,6 +867,8 @@ class Environment:
         """
         if map_data.shape == self.grid_size:
             self.grid = map_data.copy()
+            self._changed((0, 0), (self.grid_size[0] - 1, self.grid_size[1] - 1))
+            self._loaded_version = self.version
         else:
             raise ValueError(f"Map size {map_data.shape} does not match grid size {self.grid_size}")
             
@@ -111,3 +880,21 @@ class Environment:
             numpy.ndarray: 2D array representing the map
         """
         return self.grid.copy()
+    
+    def copy(self):
+        """
+        Create an independent copy of the environment.
+        
+        The grid itself is shared read-only until either environment edits
+        it, so copies are cheap even for large maps.
+        
+        Returns:
+            Environment: A new environment with the same grid and version
+        """
+        self.grid.flags.writeable = False
+        environment = Environment(grid_size=self.grid_size)
+        environment.grid = self.grid
+        environment.version = self.version
+        environment._fingerprint = self._fingerprint
+        environment._loaded_version = self._loaded_version
+        return environment
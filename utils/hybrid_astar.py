@@ -0,0 +1,194 @@
+import numpy as np
+import heapq
+import math
+
+from utils.cache import cache_path, load_arrays, save_arrays
+from utils.path_planning import cost_to_go
+from utils.vehicle import Vehicle
+
+# Motion primitive tables already loaded in this process
+_primitives = {}
+
+# Largest ratio of the 8-connected grid cost to the straight-line distance
+# (at 22.5 degrees: sqrt(4 - 2 * sqrt(2))), used to keep the grid cost a lower bound
+OCTILE_OVERESTIMATE = math.sqrt(4 - 2 * math.sqrt(2))
+
+def motion_primitives(turn_rate=Vehicle.MAX_TURN_RATE, step_size=Vehicle.MOVE_SPEED, steps=5):
+    """
+    Returns the motion primitive table for a vehicle, generating it on first
+    use and caching it on disk.
+
+    Every primitive is `steps` consecutive Vehicle.follow_path steps with a
+    constant turn of -turn_rate, 0 or +turn_rate degrees: turn, then move
+    step_size forward. Headings are discretized into bins of turn_rate
+    degrees, so primitives always start and end exactly on a bin.
+
+    Args:
+        turn_rate (float): Maximum turn per step in degrees
+        step_size (float): Distance moved per step
+        steps (int): Number of steps per primitive
+
+    Returns:
+        tuple: (offsets, end_bins) where offsets (bins, 3, steps, 2) holds
+               the position after each step relative to the primitive start,
+               and end_bins (bins, 3) the heading bin at the end
+    """
+    key = (turn_rate, step_size, steps)
+    if key in _primitives:
+        return _primitives[key]
+
+    path = cache_path(f"motion_primitives_{turn_rate:g}_{step_size:g}_{steps}.npz")
+    data = load_arrays(path, "offsets", "end_bins")
+    if data is not None:
+        table = (data["offsets"], data["end_bins"])
+    else:
+        num_bins = int(round(360 / turn_rate))
+        offsets = np.zeros((num_bins, 3, steps, 2))
+        end_bins = np.zeros((num_bins, 3), dtype=int)
+        for b in range(num_bins):
+            for k, turn in enumerate((-1, 0, 1)):
+                heading_bin, x, y = b, 0.0, 0.0
+                for step in range(steps):
+                    heading_bin += turn
+                    heading_rad = math.radians(heading_bin * turn_rate)
+                    x += step_size * math.cos(heading_rad)
+                    y += step_size * math.sin(heading_rad)
+                    offsets[b, k, step] = (x, y)
+                end_bins[b, k] = heading_bin % num_bins
+        table = (offsets, end_bins)
+        save_arrays(path, offsets=offsets, end_bins=end_bins)
+
+    _primitives[key] = table
+    return table
+
+def _heuristic_table(environment, goal_cell):
+    """
+    Return the obstacle-aware cost-to-goal table that ignores the vehicle's
+    turning limits, computed once per map content and goal and shared by
+    every environment with that map.
+    """
+    return environment.derived(("cost_to_go", goal_cell), lambda: cost_to_go(goal_cell, environment))
+
+def hybrid_a_star(start, goal, environment, start_heading=0, steps_per_primitive=5,
+                  resolution=0.5, turn_penalty=0.1, max_expansions=20000, cancel_event=None):
+    """
+    Implements Hybrid A*, which searches over continuous (x, y) positions and
+    discrete heading bins using motion primitives the vehicle can execute.
+
+    Primitives come from motion_primitives() with the Vehicle's step size and
+    two thirds of its maximum turn rate, so every returned segment respects
+    the vehicle's turning limits while leaving Vehicle.follow_path some
+    turning margin to correct drift; the path is driven without overshoot.
+    Search states are merged on a (x, y, heading) lattice of the given
+    resolution. The heuristic is the larger of the straight-line distance
+    and a cached grid cost-to-goal that accounts for obstacles, scaled down
+    by the most the 8-connected grid cost can exceed a straight line so it
+    never overestimates. The path is still not exactly the shortest: states
+    merged on the lattice, the three-way primitives and the turn penalty can
+    each make it a few steps longer than the best drivable path.
+
+    Args:
+        start (tuple): Starting position (x, y) or pose (x, y, heading)
+        goal (tuple): Goal position (x, y)
+        environment (Environment): The environment object containing obstacle information
+        start_heading (float): Starting heading in degrees, if start has none
+        steps_per_primitive (int): Number of follow steps per primitive
+        resolution (float): Position resolution used to merge search states
+        turn_penalty (float): Extra cost for turning primitives
+        max_expansions (int): Maximum number of nodes to expand
+        cancel_event (threading.Event): Optional event that aborts the search when set
+
+    Returns:
+        list: List of (x, y) waypoints from start to goal, one per follow
+              step, or an empty list if no path is found
+    """
+    turn_rate, step_size = Vehicle.MAX_TURN_RATE * 2 / 3, Vehicle.MOVE_SPEED
+    offsets, end_bins = motion_primitives(turn_rate, step_size, steps_per_primitive)
+    num_bins = len(offsets)
+    primitive_length = steps_per_primitive * step_size
+
+    heading = start[2] if len(start) > 2 else start_heading
+    start = (float(start[0]), float(start[1]))
+    goal = (float(goal[0]), float(goal[1]))
+    goal_cell = (round(goal[0]), round(goal[1]))
+    if not environment.is_valid_position(start) or not environment.is_valid_position(goal):
+        return []
+
+    table = _heuristic_table(environment, goal_cell)
+
+    def heuristic(x, y):
+        straight = math.hypot(goal[0] - x, goal[1] - y)
+        # Positions may be up to half a diagonal away from their cell centre
+        return max(straight, table[round(x), round(y)] / OCTILE_OVERESTIMATE - 0.75)
+
+    def lattice_key(x, y, heading_bin):
+        return (round(x / resolution), round(y / resolution), heading_bin)
+
+    # Node storage: position, heading bin, cost, parent and primitive of each node
+    xs, ys, bins, g_scores, parents = [start[0]], [start[1]], [round(heading / turn_rate) % num_bins], [0.0], [-1]
+    primitives = [None]
+    open_set = [(heuristic(*start), 0)]
+    closed_set = set()
+    expansions = 0
+
+    while open_set and expansions < max_expansions:
+        if cancel_event is not None and cancel_event.is_set():
+            return []
+
+        _, node = heapq.heappop(open_set)
+
+        # Negative entries are finished paths, ending with a straight run
+        # from node ~entry; the cheapest one is popped before any costlier node
+        if node < 0:
+            node = ~node
+            # Emit every follow step so the vehicle tracks each primitive
+            # exactly, reaching one waypoint per step
+            segments = [[goal]]
+            while parents[node] >= 0:
+                parent = parents[node]
+                segments.append(offsets[bins[parent], primitives[node]] + (xs[parent], ys[parent]))
+                node = parent
+            segments.append([start])
+            return [(float(px), float(py)) for segment in reversed(segments) for px, py in segment]
+
+        x, y, heading_bin = xs[node], ys[node], bins[node]
+        key = lattice_key(x, y, heading_bin)
+        if key in closed_set:
+            continue
+        closed_set.add(key)
+        expansions += 1
+
+        # Finish with a straight run when the goal is close and nearly ahead
+        dx, dy = goal[0] - x, goal[1] - y
+        bearing = (math.degrees(math.atan2(dy, dx)) - heading_bin * turn_rate + 180) % 360 - 180
+        if (math.hypot(dx, dy) <= primitive_length and abs(bearing) <= 3 * turn_rate
+                and environment.has_line_of_sight((x, y), goal)):
+            heapq.heappush(open_set, (g_scores[node] + math.hypot(dx, dy), ~node))
+
+        # Collision check every step of the three primitives in one batch
+        points = offsets[heading_bin] + (x, y)
+        starts = np.concatenate([np.broadcast_to((x, y), (3, 1, 2)), points[:, :-1]], axis=1)
+        clear = environment.segments_clear(starts.reshape(-1, 2), points.reshape(-1, 2))
+        clear = clear.reshape(3, steps_per_primitive).all(axis=1)
+
+        for k in range(3):
+            if not clear[k]:
+                continue
+            nx, ny = points[k, -1]
+            next_bin = int(end_bins[heading_bin, k])
+            if lattice_key(nx, ny, next_bin) in closed_set:
+                continue
+            h = heuristic(nx, ny)
+            if h == np.inf:
+                continue
+            g = g_scores[node] + primitive_length + (turn_penalty if k != 1 else 0)
+            xs.append(float(nx))
+            ys.append(float(ny))
+            bins.append(next_bin)
+            g_scores.append(g)
+            parents.append(node)
+            primitives.append(k)
+            heapq.heappush(open_set, (g + h, len(xs) - 1))
+
+    # If we get here, no path was found
+    return []
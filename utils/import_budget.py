@@ -0,0 +1,102 @@
+"""
+Check that the simulation modules import quickly.
+
+Runs each module in a fresh interpreter with `python -X importtime` and
+compares its cumulative import time with a fixed budget. It also fails if
+importing a headless module pulls in one of the heavy optional
+dependencies, which must only be imported by the feature that needs them.
+The Streamlit app is checked too: importing it runs the script once in bare
+mode, which is the cold start of a new session.
+
+Usage:
+    python -m utils.import_budget
+"""
+import os
+import subprocess
+import sys
+
+# Cumulative import time budget per module, in seconds
+IMPORT_BUDGETS = {
+    "utils.environment": 0.25,
+    "utils.path_planning": 0.25,
+    "utils.sensors": 0.25,
+    "utils.vehicle": 0.25,
+    "utils.planning_service": 0.25,
+    "utils.rrt_star": 0.25,
+    "utils.hybrid_astar": 0.25,
+    "utils.local_planner": 0.25,
+    "utils.mapping": 0.25,
+    "utils.localization": 0.25,
+    "utils.map_registry": 0.25,
+    "utils.simulation": 0.25,
+    "utils.route_planning": 0.25,
+    "utils.quadtree": 0.25,
+    "utils.camera": 0.25,
+    "utils.landmarks": 0.25,
+    "utils.spatial_hash": 0.25,
+    "main": 0.25,
+    "app": 2.0,
+}
+
+# Packages the headless modules must not import at load time
+HEAVY_DEPENDENCIES = ("cv2", "matplotlib", "pandas", "plotly", "streamlit")
+
+# Heavy dependencies a module is allowed to import (the app renders with them)
+ALLOWED_DEPENDENCIES = {
+    "app": ("cv2", "pandas", "plotly", "streamlit"),
+}
+
+def measure_import(module):
+    """
+    Import a module in a fresh interpreter and time it.
+
+    Args:
+        module (str): Dotted module name
+
+    Returns:
+        tuple: (cumulative import time in seconds, set of top-level packages imported)
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=root, capture_output=True, text=True, check=True)
+
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    cumulative, imported = None, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].strip()
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative = int(fields[1]) / 1e6
+    return cumulative, imported
+
+def check_budgets(budgets=IMPORT_BUDGETS):
+    """
+    Measure every module and report the ones over budget.
+
+    Args:
+        budgets (dict): Budget in seconds per module
+
+    Returns:
+        list: Descriptions of every violation (empty if all modules pass)
+    """
+    violations = []
+    for module, budget in budgets.items():
+        seconds, imported = measure_import(module)
+        heavy = sorted(imported.intersection(HEAVY_DEPENDENCIES).difference(ALLOWED_DEPENDENCIES.get(module, ())))
+        print(f"{module:<28} {seconds * 1000:8.1f} ms  (budget {budget * 1000:.0f} ms)")
+        if seconds > budget:
+            violations.append(f"{module} took {seconds * 1000:.1f} ms, over its {budget * 1000:.0f} ms budget")
+        if heavy:
+            violations.append(f"{module} imports {', '.join(heavy)} at load time")
+    return violations
+
+if __name__ == "__main__":
+    violations = check_budgets()
+    for violation in violations:
+        print(f"FAIL: {violation}")
+    sys.exit(1 if violations else 0)
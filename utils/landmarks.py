@@ -0,0 +1,200 @@
+import numpy as np
+import os
+import threading
+from collections import OrderedDict
+
+from utils.cache import cache_dir, cache_path, load_arrays, save_arrays
+from utils.path_planning import a_star, cost_to_go
+
+# Number of landmark files kept in the cache directory, most recently used first
+PERSISTED_LANDMARK_FILES = 8
+
+def select_landmarks(environment, num_landmarks=16):
+    """
+    Pick landmarks by farthest-point selection: each new landmark is the free
+    cell farthest (by path cost) from the landmarks chosen so far. Cells no
+    landmark reaches count as infinitely far, so every separate region of
+    free space gets a landmark before any region gets a second one.
+
+    Args:
+        environment (Environment): The environment object containing obstacle information
+        num_landmarks (int): Maximum number of landmarks
+
+    Returns:
+        tuple: (landmarks, distances) where landmarks is a list of cells (x, y)
+               and distances (K, width, height) holds each landmark's cost_to_go
+               field as float32
+    """
+    free = environment.grid != 1
+    landmarks, fields = [], []
+    if not free.any():
+        return landmarks, np.zeros((0,) + tuple(environment.grid_size), dtype=np.float32)
+
+    # The first landmark is the cell farthest from an arbitrary free cell
+    seed = tuple(int(v) for v in np.argwhere(free)[0])
+    nearest = cost_to_go(seed, environment)
+
+    for _ in range(num_landmarks):
+        candidates = np.where(free, nearest, -1.0)
+        cell = tuple(int(v) for v in np.unravel_index(np.argmax(candidates), candidates.shape))
+        if candidates[cell] <= 0:
+            # Every free cell is already a landmark
+            break
+        field = cost_to_go(cell, environment)
+        nearest = field if not fields else np.minimum(nearest, field)
+        landmarks.append(cell)
+        fields.append(field)
+
+    if not fields:
+        return landmarks, np.zeros((0,) + tuple(environment.grid_size), dtype=np.float32)
+    return landmarks, np.stack(fields).astype(np.float32)
+
+class LandmarkHeuristic:
+    """
+    ALT (A*, landmarks, triangle inequality) heuristic.
+
+    For any landmark L, |d(L, goal) - d(L, n)| is a lower bound on the path
+    cost from n to the goal, and the largest bound over all landmarks is
+    admissible and far tighter than the straight-line distance around walls.
+    Calling the heuristic with a goal returns the bounds for every cell as
+    one array operation; the last few goals' arrays are kept. Distances are
+    stored as float32, and the bounds are lowered by the rounding error so
+    they stay admissible.
+    """
+
+    def __init__(self, landmarks, distances, max_goals=16):
+        """
+        Initialize the heuristic from precomputed landmark distances.
+
+        Args:
+            landmarks (list): Landmark cells (x, y)
+            distances (numpy.ndarray): Path cost from each landmark to every cell, shape (K, width, height)
+            max_goals (int): Number of goals whose bound arrays are kept
+        """
+        self.landmarks = [tuple(int(v) for v in landmark) for landmark in landmarks]
+        self.distances = np.asarray(distances, dtype=np.float32)
+        self.distances.flags.writeable = False  # Shared by every environment with this map
+
+        # Rounding error of a difference of two stored distances
+        finite = self.distances[np.isfinite(self.distances)]
+        self.slack = 2 * float(np.spacing(finite.max())) if finite.size else 0.0
+        self.max_goals = max_goals
+        self._bounds = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        # Memory held by the distance arrays, for the derived-structure cache budget
+        return self.distances.nbytes
+
+    def __call__(self, goal):
+        """
+        Lower bounds on the path cost from every cell to a goal.
+
+        Args:
+            goal (tuple): Goal position (x, y)
+
+        Returns:
+            numpy.ndarray: Read-only array of shape (width, height); infinite
+                           for cells that cannot reach the goal
+        """
+        goal = (round(goal[0]), round(goal[1]))
+        with self._lock:
+            if goal in self._bounds:
+                self._bounds.move_to_end(goal)
+                return self._bounds[goal]
+
+        width, height = self.distances.shape[1:]
+        if len(self.landmarks) == 0 or not (0 <= goal[0] < width and 0 <= goal[1] < height):
+            bounds = np.zeros((width, height))
+        else:
+            to_goal = self.distances[:, goal[0], goal[1]]
+            with np.errstate(invalid='ignore'):
+                gaps = np.abs(self.distances - to_goal[:, None, None])
+            # A landmark reaching neither cell (inf - inf) tells nothing
+            bounds = np.where(np.isnan(gaps), 0.0, gaps).max(axis=0).astype(float)
+            bounds = np.maximum(bounds - self.slack, 0.0)
+        bounds.flags.writeable = False
+
+        with self._lock:
+            self._bounds[goal] = bounds
+            while len(self._bounds) > self.max_goals:
+                self._bounds.popitem(last=False)
+        return bounds
+
+def _prune_persisted(keep=PERSISTED_LANDMARK_FILES):
+    # Remove all but the most recently used landmark files. Other processes
+    # may prune at the same time, and a reader losing its file just rebuilds
+    directory = cache_dir()
+    used = []
+    for name in os.listdir(directory):
+        if name.startswith("landmarks_") and name.endswith(".npz"):
+            path = os.path.join(directory, name)
+            try:
+                used.append((os.path.getmtime(path), path))
+            except OSError:
+                pass  # Already removed by another process
+    used.sort(reverse=True)
+    for _, path in used[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Already removed by another process
+
+def landmark_heuristic(environment, num_landmarks=16, persist=True):
+    """
+    Return the landmark heuristic of a map, built once per map content and
+    shared through Environment.derived(). The landmark distances of maps
+    that were created or loaded whole are also stored in the cache
+    directory, so later runs on the same map skip the precomputation. Maps
+    that only exist because of in-session edits are not stored, and only
+    the PERSISTED_LANDMARK_FILES most recently used files are kept.
+
+    Args:
+        environment (Environment): The environment object containing obstacle information
+        num_landmarks (int): Maximum number of landmarks
+        persist (bool): Whether to load and save the distances in the cache directory
+
+    Returns:
+        LandmarkHeuristic: Heuristic for a_star()
+    """
+    def build():
+        path = None
+        if persist and not environment.edited:
+            path = cache_path(f"landmarks_{environment.fingerprint()}_{num_landmarks}.npz")
+        # A missing, truncated or pruned file is a cache miss
+        data = load_arrays(path, "landmarks", "distances") if path is not None else None
+        if data is not None:
+            heuristic = LandmarkHeuristic(data["landmarks"], data["distances"])
+            try:
+                os.utime(path)  # Mark as recently used
+            except OSError:
+                pass  # Pruned by another process meanwhile
+            return heuristic
+
+        landmarks, distances = select_landmarks(environment, num_landmarks)
+        if path is not None:
+            save_arrays(path, compressed=True, landmarks=np.array(landmarks, dtype=int).reshape(-1, 2),
+                        distances=distances)
+            _prune_persisted()
+        return LandmarkHeuristic(landmarks, distances)
+    return environment.derived(("landmarks", num_landmarks), build)
+
+def alt_a_star(start, goal, environment, cancel_event=None, num_landmarks=16):
+    """
+    A* with the landmark (ALT) heuristic. The first query on a map pays for
+    the landmark searches; repeated queries on the same static map expand
+    far fewer nodes than with the straight-line heuristic.
+
+    Args:
+        start (tuple): Starting position (x, y)
+        goal (tuple): Goal position (x, y)
+        environment (Environment): The environment object containing obstacle information
+        cancel_event (threading.Event): Optional event that aborts the search when set
+        num_landmarks (int): Maximum number of landmarks
+
+    Returns:
+        list: List of coordinates representing the path from start to goal,
+              or an empty list if no path is found
+    """
+    return a_star(start, goal, environment, cancel_event, heuristic=landmark_heuristic(environment, num_landmarks))
@@ -0,0 +1,213 @@
+import numpy as np
+import math
+import time
+
+from utils.sensors import simulate_proximity_sensors
+from utils.vehicle import Vehicle
+
+class DynamicWindowPlanner:
+    """
+    Dynamic Window Approach (DWA) local planner.
+
+    Each tick it samples (velocity, turn rate) commands reachable from the
+    current velocity, rolls every command forward for a short horizon in one
+    NumPy batch and scores the rollouts on progress towards the target,
+    heading, clearance from obstacles and speed. Clearance comes from the
+    environment's cached obstacle distance field plus any obstacles reported
+    by the proximity sensors.
+    """
+
+    def __init__(self, environment, max_speed=Vehicle.MOVE_SPEED, max_turn_rate=Vehicle.MAX_TURN_RATE,
+                 max_acceleration=0.1, velocity_samples=11, turn_samples=31, horizon=10,
+                 weights=(1.0, 0.2, 0.4, 0.2), clearance_cap=1.5, min_clearance=0.05, lookahead=1.0,
+                 time_budget=0.005):
+        """
+        Initialize the planner.
+
+        Args:
+            environment (Environment): The environment object containing obstacle information
+            max_speed (float): Maximum distance per step
+            max_turn_rate (float): Maximum turn per step in degrees
+            max_acceleration (float): Maximum speed change per step
+            velocity_samples (int): Number of velocities sampled in the window
+            turn_samples (int): Number of turn rates sampled in the window
+            horizon (int): Number of steps each command is rolled forward
+            weights (tuple): Score weights (progress, heading, clearance, velocity)
+            clearance_cap (float): Clearance beyond which a rollout scores the same
+            min_clearance (float): Rollouts passing closer to an obstacle are rejected
+            lookahead (float): Distance along the path of the point steered towards
+            time_budget (float): Time budget per tick in seconds, or None to always
+                                 evaluate the whole window (deterministic)
+        """
+        self.environment = environment
+        self.max_speed = max_speed
+        self.max_turn_rate = max_turn_rate
+        self.max_acceleration = max_acceleration
+        self.velocity_samples = velocity_samples
+        self.turn_samples = turn_samples
+        self.horizon = horizon
+        self.weights = weights
+        self.clearance_cap = clearance_cap
+        self.min_clearance = min_clearance
+        self.lookahead = lookahead
+        self.time_budget = time_budget
+
+    def _commands(self, velocity):
+        """
+        Sample the dynamic window, ordered coarse to fine so an early stop
+        still covers the whole window.
+        """
+        velocities = np.linspace(max(0.0, velocity - self.max_acceleration),
+                                 min(self.max_speed, velocity + self.max_acceleration),
+                                 self.velocity_samples)
+        turns = np.linspace(-self.max_turn_rate, self.max_turn_rate, self.turn_samples)
+        commands = np.stack(np.meshgrid(velocities, turns, indexing='ij'), axis=-1).reshape(-1, 2)
+        order = np.concatenate([np.arange(0, len(commands), 4), np.arange(2, len(commands), 4),
+                                np.arange(1, len(commands), 2)])
+        return commands[order]
+
+    def _rollouts(self, pose, commands):
+        """
+        Positions and final headings of every command over the horizon: each
+        step turns, then moves, like Vehicle.follow_path.
+        """
+        steps = np.arange(1, self.horizon + 1)
+        headings = np.radians(pose[2] + commands[:, 1, None] * steps)
+        xs = pose[0] + np.cumsum(commands[:, 0, None] * np.cos(headings), axis=1)
+        ys = pose[1] + np.cumsum(commands[:, 0, None] * np.sin(headings), axis=1)
+        return np.stack([xs, ys], axis=-1), headings[:, -1]
+
+    def _clearance(self, points, obstacles):
+        # Distance from each rollout point to the nearest map or sensed obstacle.
+        # The distance field is measured between cell centres, so half a cell
+        # approximates the distance to the obstacle's edge.
+        field = self.environment.distance_field()
+        cells = np.rint(points).astype(int)
+        cx = np.clip(cells[..., 0], 0, field.shape[0] - 1)
+        cy = np.clip(cells[..., 1], 0, field.shape[1] - 1)
+        clearance = field[cx, cy] - 0.5
+        if obstacles is not None and len(obstacles):
+            offsets = points[..., None, :] - np.asarray(obstacles, dtype=float)
+            clearance = np.minimum(clearance, np.hypot(offsets[..., 0], offsets[..., 1]).min(axis=-1))
+        return clearance
+
+    def plan(self, pose, velocity, target, obstacles=None):
+        """
+        Choose the next command.
+
+        Args:
+            pose (tuple): Current pose (x, y, heading in degrees)
+            velocity (float): Current velocity
+            target (tuple): Position (x, y) to steer towards
+            obstacles (numpy.ndarray): Optional extra obstacle points (N, 2),
+                                       e.g. from the proximity sensors
+
+        Returns:
+            tuple: (velocity, turn) for the next step, turn in degrees
+        """
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        pose = np.asarray(pose, dtype=float)
+        target = np.asarray(target, dtype=float)[:2]
+        commands = self._commands(velocity)
+
+        # Evaluate the window in chunks until the time budget runs out
+        chunk = max(len(commands) // 4, 1)
+        scored, raw = [], []
+        for start in range(0, len(commands), chunk):
+            batch = commands[start:start + chunk]
+            points, final_headings = self._rollouts(pose, batch)
+
+            # A rollout only counts up to its first unsafe point, and is
+            # rejected unless the vehicle could brake before reaching it
+            point_clearance = self._clearance(points, obstacles)
+            safe = self.environment.are_valid_positions(points) & (point_clearance >= self.min_clearance)
+            safe_steps = np.where(safe.all(axis=1), self.horizon, np.argmin(safe, axis=1))
+            braking_steps = np.ceil(batch[:, 0] / self.max_acceleration).astype(int) + 1
+            admissible = safe_steps >= np.minimum(braking_steps, self.horizon)
+            within = np.arange(self.horizon) < safe_steps[:, None]
+            clearance = np.where(within, point_clearance, np.inf).min(axis=1)
+
+            # Progress score: closest approach to the target along the safe part
+            offsets = target - points
+            approach = np.where(within, np.hypot(offsets[..., 0], offsets[..., 1]), np.inf).min(axis=1)
+
+            # Heading score: how directly the rollout ends up facing the target
+            to_target = offsets[:, -1]
+            bearing = np.arctan2(to_target[:, 1], to_target[:, 0]) - final_headings
+            heading_error = np.abs((bearing + np.pi) % (2 * np.pi) - np.pi)
+
+            scored.append(batch[admissible])
+            raw.append(np.stack([-approach, np.pi - heading_error,
+                                 np.minimum(clearance, self.clearance_cap), batch[:, 0]], axis=1)[admissible])
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+        scored, raw = np.concatenate(scored), np.concatenate(raw)
+        if len(scored) == 0:
+            # Nothing is safe: stop and turn towards the target in place
+            bearing = math.degrees(math.atan2(target[1] - pose[1], target[0] - pose[0])) - pose[2]
+            bearing = (bearing + 180) % 360 - 180
+            return 0.0, float(np.clip(bearing, -self.max_turn_rate, self.max_turn_rate))
+
+        # Normalize every term over the candidates, then combine
+        spans = raw.max(axis=0) - raw.min(axis=0)
+        normalized = (raw - raw.min(axis=0)) / np.where(spans > 0, spans, 1)
+        best = int(np.argmax(normalized @ np.asarray(self.weights)))
+        return float(scored[best, 0]), float(scored[best, 1])
+
+    def step(self, vehicle, path):
+        """
+        Move a vehicle one step along a path, avoiding obstacles reported by
+        the proximity sensors. Drop-in replacement for Vehicle.follow_path.
+
+        Args:
+            vehicle (Vehicle): Vehicle to move
+            path (list): List of positions to follow
+
+        Returns:
+            bool: True if reached the end of the path, False otherwise
+        """
+        if not path or vehicle.path_index >= len(path):
+            return True
+
+        # Done once the vehicle is within tolerance of the final waypoint
+        waypoints = np.array([point[:2] for point in path], dtype=float)
+        position = np.asarray(vehicle.position, dtype=float)
+        if math.dist(vehicle.position, waypoints[-1]) < vehicle.WAYPOINT_TOLERANCE:
+            vehicle.path_index = len(path)
+            return True
+
+        # Project the vehicle onto the path segments just behind and ahead of
+        # it, since avoiding obstacles can take it past waypoints without
+        # touching them
+        first = max(vehicle.path_index - 1, 0)
+        starts, ends = waypoints[first:-1], waypoints[first + 1:]
+        if len(starts):
+            segments = ends - starts
+            lengths = np.hypot(segments[:, 0], segments[:, 1])
+            arc = np.concatenate([[0.0], np.cumsum(lengths)])
+            t = np.clip(np.einsum('ij,ij->i', position - starts, segments) / np.maximum(lengths, 1e-12) ** 2, 0, 1)
+            offsets = starts + t[:, None] * segments - position
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+            distances[arc[:-1] > arc[1] + 2 * self.lookahead] = np.inf
+            k = int(np.argmin(distances))
+            vehicle.path_index = first + k + 1
+
+            # Steer towards the point the lookahead distance further along the path
+            along = arc[k] + t[k] * lengths[k] + self.lookahead
+            target = (np.interp(along, arc, waypoints[first:, 0]), np.interp(along, arc, waypoints[first:, 1]))
+        else:
+            target = waypoints[-1]
+
+        # Obstacles sensed around the vehicle (sensors point along fixed world axes)
+        readings = simulate_proximity_sensors(vehicle.position, self.environment)
+        sensed = [(vehicle.position[0] + d * math.cos(math.radians(angle)),
+                   vehicle.position[1] + d * math.sin(math.radians(angle)))
+                  for d, angle in zip(readings, (0, 90, 180, 270)) if d < 2]
+
+        velocity, turn = self.plan((*vehicle.position, vehicle.heading), vehicle.velocity,
+                                   target, np.array(sensed).reshape(-1, 2))
+        vehicle.turn(turn)
+        vehicle.velocity = velocity
+        vehicle.move(velocity)
+        return False
@@ -0,0 +1,226 @@
+import numpy as np
+
+# Upper 1 - delta quantile of the standard normal distribution (delta = 0.01)
+_KLD_Z = 2.326
+
+def lidar_ranges(position, points):
+    """
+    Convert simulate_lidar end points into ranges measured from the sensor.
+
+    Args:
+        position (tuple): Position (x, y) the scan was taken from
+        points (list): Ray end points, as returned by simulate_lidar
+
+    Returns:
+        numpy.ndarray: Range of every ray
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    return np.hypot(*(points - np.asarray(position, dtype=float)[:2]).T)
+
+class ParticleFilter:
+    """
+    Monte Carlo localization: tracks the vehicle pose (x, y, heading in
+    degrees) with a set of weighted particles.
+
+    Particles are moved with noisy odometry from Vehicle.turn/move, weighted
+    against LiDAR ranges with a likelihood field (the environment's obstacle
+    distance field) and resampled with a low-variance sampler. The number of
+    particles adapts to the spread of the belief (KLD sampling). Every step
+    works on all particles at once.
+    """
+
+    def __init__(self, environment, num_particles=1000, initial_pose=None, initial_spread=(0.5, 10),
+                 min_particles=100, max_particles=5000, motion_noise=(0.1, 0.02, 0.1, 1.0),
+                 sigma_hit=0.3, z_hit=0.9, kld_epsilon=0.05, kld_bin_size=(0.5, 0.5, 10), seed=None):
+        """
+        Initialize the filter.
+
+        Args:
+            environment (Environment): Map the vehicle is localized in
+            num_particles (int): Initial number of particles
+            initial_pose (tuple): Approximate starting pose (x, y, heading); if
+                                  None, particles are spread over all free cells
+            initial_spread (tuple): Standard deviations (position, heading in degrees)
+                                    around initial_pose
+            min_particles (int): Lower bound for the adaptive particle count
+            max_particles (int): Upper bound for the adaptive particle count
+            motion_noise (tuple): (distance noise per unit moved, distance noise floor,
+                                   turn noise per degree turned, turn noise floor in degrees)
+            sigma_hit (float): Standard deviation of a range measurement, in cells
+            z_hit (float): Weight of the measurement model's hit component
+                           (the rest models random readings)
+            kld_epsilon (float): Maximum KL divergence between the particle set
+                                 and the true belief, for KLD sampling
+            kld_bin_size (tuple): KLD histogram bin size (x, y, heading in degrees)
+            seed (int): Seed for the filter's random generator
+        """
+        self.environment = environment
+        self.min_particles = min_particles
+        self.max_particles = max_particles
+        self.motion_noise = motion_noise
+        self.sigma_hit = sigma_hit
+        self.z_hit = z_hit
+        self.kld_epsilon = kld_epsilon
+        self.kld_bin_size = np.asarray(kld_bin_size, dtype=float)
+        self.rng = np.random.default_rng(seed)
+
+        if initial_pose is None:
+            # Global localization: uniform over free cells
+            free = np.argwhere(environment.grid != 1)
+            picks = free[self.rng.integers(len(free), size=num_particles)]
+            self.particles = np.column_stack([
+                picks + self.rng.uniform(-0.5, 0.5, size=(num_particles, 2)),
+                self.rng.uniform(0, 360, size=num_particles),
+            ])
+        else:
+            spread = np.array([initial_spread[0], initial_spread[0], initial_spread[1]])
+            self.particles = np.asarray(initial_pose, dtype=float) + \
+                self.rng.normal(size=(num_particles, 3)) * spread
+            self.particles[:, 2] %= 360
+
+        self.weights = np.full(num_particles, 1.0 / num_particles)
+
+    def predict(self, turn, distance):
+        """
+        Apply an odometry step: turn by `turn` degrees, then move `distance`
+        forward (the order Vehicle.follow_path uses), with noise.
+
+        Args:
+            turn (float): Commanded turn in degrees
+            distance (float): Commanded distance
+        """
+        n = len(self.particles)
+        d_rate, d_floor, t_rate, t_floor = self.motion_noise
+        turns = turn + self.rng.normal(0, t_rate * abs(turn) + t_floor, size=n)
+        distances = distance + self.rng.normal(0, d_rate * abs(distance) + d_floor, size=n)
+
+        self.particles[:, 2] = (self.particles[:, 2] + turns) % 360
+        heading_rad = np.radians(self.particles[:, 2])
+        self.particles[:, 0] += distances * np.cos(heading_rad)
+        self.particles[:, 1] += distances * np.sin(heading_rad)
+
+    def update(self, ranges, angles, max_range=5):
+        """
+        Weight the particles by how well a LiDAR scan fits the map from their pose.
+
+        Args:
+            ranges (numpy.ndarray): Measured range of every ray
+            angles (numpy.ndarray): Ray angles in degrees, relative to the heading
+            max_range (float): Maximum range; rays at max range carry no hit
+        """
+        ranges = np.asarray(ranges, dtype=float)
+        angles = np.asarray(angles, dtype=float)
+        hits = ranges < max_range
+        ranges, angles = ranges[hits], angles[hits]
+
+        # Beam end points for every particle, shape (P, R)
+        beam_angles = np.radians(self.particles[:, 2, None] + angles[None, :])
+        ends_x = self.particles[:, 0, None] + ranges * np.cos(beam_angles)
+        ends_y = self.particles[:, 1, None] + ranges * np.sin(beam_angles)
+
+        # Distance from each end point to the nearest obstacle; the outside
+        # of the grid counts as an obstacle
+        field = self.environment.distance_field()
+        cx, cy = np.rint(ends_x).astype(int), np.rint(ends_y).astype(int)
+        inside = (cx >= 0) & (cx < field.shape[0]) & (cy >= 0) & (cy < field.shape[1])
+        distances = np.where(inside, field[np.clip(cx, 0, field.shape[0] - 1),
+                                           np.clip(cy, 0, field.shape[1] - 1)], 0.0)
+
+        # Mixture of a Gaussian around the nearest obstacle and random readings
+        likelihood = self.z_hit * np.exp(-0.5 * (distances / self.sigma_hit) ** 2) + \
+            (1 - self.z_hit) / max_range
+        with np.errstate(divide='ignore'):
+            log_weights = np.log(self.weights) + np.log(likelihood).sum(axis=1)
+
+        # Particles inside obstacles or off the map are impossible
+        log_weights[~self.environment.are_valid_positions(self.particles[:, :2])] = -np.inf
+
+        if not np.isfinite(log_weights).any():
+            self.weights = np.full(len(self.particles), 1.0 / len(self.particles))
+            return
+        weights = np.exp(log_weights - log_weights.max())
+        self.weights = weights / weights.sum()
+
+    def effective_sample_size(self):
+        """
+        Returns:
+            float: Effective number of particles, 1 / sum(w^2)
+        """
+        return 1.0 / np.sum(self.weights ** 2)
+
+    def _low_variance_indices(self, count):
+        # One random offset, then evenly spaced pointers into the cumulative weights
+        positions = (self.rng.random() + np.arange(count)) / count
+        cumulative = np.cumsum(self.weights)
+        cumulative[-1] = 1.0
+        return np.searchsorted(cumulative, positions)
+
+    def _kld_count(self, particles):
+        """
+        Smallest prefix of `particles` that satisfies the KLD bound for the
+        number of histogram bins it occupies.
+        """
+        bins = np.floor(particles / self.kld_bin_size).astype(np.int64)
+        _, first = np.unique(bins, axis=0, return_index=True)
+        is_new = np.zeros(len(particles), dtype=bool)
+        is_new[first] = True
+        occupied = np.cumsum(is_new)
+
+        # Wilson-Hilferty approximation of the chi-square quantile
+        k = np.maximum(occupied - 1, 1)
+        a = 2.0 / (9.0 * k)
+        required = k / (2 * self.kld_epsilon) * (1 - a + np.sqrt(a) * _KLD_Z) ** 3
+        required = np.where(occupied > 1, required, self.min_particles)
+
+        counts = np.arange(1, len(particles) + 1)
+        enough = counts >= np.maximum(required, self.min_particles)
+        return int(counts[enough.argmax()]) if enough.any() else len(particles)
+
+    def resample(self, adaptive=True):
+        """
+        Draw a new, equally weighted particle set with the low-variance sampler.
+
+        Args:
+            adaptive (bool): Whether to adapt the particle count with KLD sampling
+        """
+        if adaptive:
+            # Draw the maximum, shuffle, and keep the shortest prefix that is enough
+            candidates = self.particles[self._low_variance_indices(self.max_particles)]
+            candidates = candidates[self.rng.permutation(len(candidates))]
+            count = self._kld_count(candidates)
+            self.particles = candidates[:count].copy()
+        else:
+            self.particles = self.particles[self._low_variance_indices(len(self.particles))]
+        self.weights = np.full(len(self.particles), 1.0 / len(self.particles))
+
+    def step(self, turn, distance, ranges, angles, max_range=5, resample_threshold=0.5):
+        """
+        Run one full filter tick: predict, update and (when the weights have
+        degenerated) resample.
+
+        Args:
+            turn (float): Commanded turn in degrees
+            distance (float): Commanded distance
+            ranges (numpy.ndarray): Measured range of every ray
+            angles (numpy.ndarray): Ray angles in degrees, relative to the heading
+            max_range (float): Maximum range of the sensor
+            resample_threshold (float): Resample when the effective sample size
+                                        drops below this fraction of the particles
+        """
+        self.predict(turn, distance)
+        self.update(ranges, angles, max_range)
+        if self.effective_sample_size() < resample_threshold * len(self.particles):
+            self.resample()
+
+    def estimate(self):
+        """
+        Weighted mean pose of the particles.
+
+        Returns:
+            tuple: Estimated pose (x, y, heading in degrees)
+        """
+        x, y = self.weights @ self.particles[:, :2]
+        heading_rad = np.radians(self.particles[:, 2])
+        heading = np.degrees(np.arctan2(self.weights @ np.sin(heading_rad),
+                                        self.weights @ np.cos(heading_rad))) % 360
+        return (float(x), float(y), float(heading))
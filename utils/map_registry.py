@@ -0,0 +1,115 @@
+import threading
+from collections import OrderedDict
+
+class MapRegistry:
+    """
+    Process-wide store of maps and planned paths, shared by every session.
+
+    Maps are kept as read-only grids keyed by their fingerprint, and every
+    session gets a copy-on-write Environment on top of the shared grid, so
+    sessions viewing the same map hold one grid between them until they
+    edit it. Structures derived from the grid (distance fields, planner
+    tables) are shared through Environment.derived(). Planned paths are
+    cached per planner, start, goal and map fingerprint. Only the most
+    recently used maps are kept; evicting a map drops its paths too.
+    """
+
+    def __init__(self, max_paths=1024, max_maps=8):
+        """
+        Initialize an empty registry.
+
+        Args:
+            max_paths (int): Maximum number of planned paths to keep
+            max_maps (int): Maximum number of maps to keep
+        """
+        self.max_paths = max_paths
+        self.max_maps = max_maps
+        self._maps = OrderedDict()
+        self._paths = OrderedDict()
+        self._lock = threading.Lock()
+
+    def publish(self, environment):
+        """
+        Add a map to the registry.
+
+        Args:
+            environment (Environment): Environment whose current map is published
+
+        Returns:
+            str: Fingerprint under which the map is stored
+        """
+        fingerprint = environment.fingerprint()
+        with self._lock:
+            if fingerprint not in self._maps:
+                self._maps[fingerprint] = environment.copy()
+            self._maps.move_to_end(fingerprint)
+            while len(self._maps) > self.max_maps:
+                evicted, _ = self._maps.popitem(last=False)
+                for key in [key for key in self._paths if key[3] == evicted]:
+                    del self._paths[key]
+        return fingerprint
+
+    def environment(self, fingerprint):
+        """
+        Create an environment for a published map. The grid is shared with the
+        registry and only copied when the environment is edited. Raises
+        KeyError if the map was never published or has been evicted.
+
+        Args:
+            fingerprint (str): Fingerprint returned by publish()
+
+        Returns:
+            Environment: A new environment with the published map
+        """
+        with self._lock:
+            self._maps.move_to_end(fingerprint)
+            return self._maps[fingerprint].copy()
+
+    def path_key(self, planner, start, goal, environment):
+        """
+        Build the cache key of a planning request.
+
+        Args:
+            planner (str): Name of the planner
+            start (tuple): Start position or pose
+            goal (tuple): Goal position (x, y)
+            environment (Environment): The environment planned in
+
+        Returns:
+            tuple: Key for cached_path() and store_path()
+        """
+        return (planner, tuple(start), tuple(goal), environment.fingerprint())
+
+    def cached_path(self, key):
+        """
+        Look up a planned path.
+
+        Args:
+            key (tuple): Key from path_key()
+
+        Returns:
+            object: The planner's result (a new list for plain paths), or None
+                    if the request has not been planned yet
+        """
+        with self._lock:
+            if key not in self._paths:
+                return None
+            self._paths.move_to_end(key)
+            path, bound = self._paths[key]
+        return list(path) if bound is None else (list(path), bound)
+
+    def store_path(self, key, result):
+        """
+        Cache a planner's result. Cancelled or failed plans should not be stored.
+
+        Args:
+            key (tuple): Key from path_key()
+            result (list or tuple): A path, or a (path, bound) pair from an anytime planner
+        """
+        # Store an immutable copy, since every session reads the same entry
+        path, bound = result if isinstance(result, tuple) else (result, None)
+        with self._lock:
+            self._paths[key] = (tuple(path), bound)
+            self._paths.move_to_end(key)
+            while len(self._paths) > self.max_paths:
+                self._paths.popitem(last=False)
@@ -0,0 +1,121 @@
+import numpy as np
+
+from utils.environment import Environment, segment_samples
+
+class OccupancyGridMap:
+    """
+    A vehicle's own map of the world, built from LiDAR scans as a log-odds
+    occupancy grid. Cells along each ray are evidence of free space and the
+    cell where a ray hits is evidence of an obstacle.
+    """
+
+    def __init__(self, grid_size, l_occupied=0.85, l_free=-0.4, l_min=-4.0, l_max=4.0):
+        """
+        Initialize an empty (fully unknown) map.
+
+        Args:
+            grid_size (tuple): Size of the grid as (width, height)
+            l_occupied (float): Log-odds added to a cell where a ray hits
+            l_free (float): Log-odds added to a cell a ray passes through
+            l_min (float): Lower clamp for the log-odds of a cell
+            l_max (float): Upper clamp for the log-odds of a cell
+        """
+        self.grid_size = grid_size
+        self.l_occupied = l_occupied
+        self.l_free = l_free
+        self.l_min = l_min
+        self.l_max = l_max
+        self.log_odds = np.zeros(grid_size, dtype=np.float32)
+
+    def update(self, position, points, max_range=5, hits=None):
+        """
+        Fuse one LiDAR scan into the map.
+
+        All rays are traversed in one batch and only the window of cells
+        covered by the scan is touched. Each cell is updated at most once
+        per scan, and a hit takes precedence over free space.
+
+        Args:
+            position (tuple): Sensor position (x, y) when the scan was taken
+            points (list): Ray end points, as returned by simulate_lidar
+            max_range (float): Maximum range of the sensor
+            hits (numpy.ndarray): Optional boolean array telling which rays hit
+                                  an obstacle; by default rays shorter than
+                                  max_range are taken as hits
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) == 0:
+            return
+        origin = np.asarray(position, dtype=float)[:2]
+        if hits is None:
+            hits = np.hypot(*(points - origin).T) < max_range
+        hits = np.asarray(hits, dtype=bool)
+
+        # Cells crossed by every ray, shape (R, M, 2)
+        _, samples, mask = segment_samples(np.broadcast_to(origin, points.shape), points)
+        cells = np.rint(samples).astype(int)
+        end_cells = np.rint(points).astype(int)
+
+        # The end cell of a hit is occupied, every other crossed cell is free
+        at_end = np.all(cells == end_cells[:, None, :], axis=-1)
+        free = mask & ~(at_end & hits[:, None])
+        free_cells = cells[free]
+        occupied_cells = end_cells[hits]
+
+        # Restrict the update to the scan's bounding window inside the grid
+        all_cells = np.concatenate([free_cells, occupied_cells])
+        lo = np.maximum(all_cells.min(axis=0), 0)
+        hi = np.minimum(all_cells.max(axis=0), np.array(self.grid_size) - 1)
+        if np.any(hi < lo):
+            return
+        shape = tuple(hi - lo + 1)
+
+        def window_mask(cells):
+            inside = np.all((cells >= lo) & (cells <= hi), axis=1)
+            local = cells[inside] - lo
+            result = np.zeros(shape, dtype=bool)
+            result[local[:, 0], local[:, 1]] = True
+            return result
+
+        occupied_mask = window_mask(occupied_cells)
+        free_mask = window_mask(free_cells) & ~occupied_mask
+
+        window = self.log_odds[lo[0]:hi[0] + 1, lo[1]:hi[1] + 1]
+        window += self.l_free * free_mask + self.l_occupied * occupied_mask
+        np.clip(window, self.l_min, self.l_max, out=window)
+
+    def probabilities(self):
+        """
+        Return the occupancy probability of every cell.
+
+        Returns:
+            numpy.ndarray: Array of shape grid_size with values in [0, 1];
+                           unknown cells are 0.5
+        """
+        return 1 - 1 / (1 + np.exp(self.log_odds))
+
+    def to_grid(self, threshold=0.65):
+        """
+        Convert the map into an obstacle grid like Environment.grid.
+
+        Args:
+            threshold (float): Occupancy probability above which a cell is an obstacle
+
+        Returns:
+            numpy.ndarray: Integer array with 1 for obstacles and 0 elsewhere
+        """
+        return (self.probabilities() > threshold).astype(int)
+
+    def to_environment(self, threshold=0.65):
+        """
+        Build an Environment from the map, so planners can run on it.
+
+        Args:
+            threshold (float): Occupancy probability above which a cell is an obstacle
+
+        Returns:
+            Environment: Environment whose obstacles are the mapped obstacles
+        """
+        environment = Environment(grid_size=self.grid_size)
+        environment.load_map(self.to_grid(threshold))
+        return environment
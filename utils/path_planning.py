@@ -1,8 +1,9 @@
 import numpy as np
 import heapq
+import time
 from collections import defaultdict
 
-def a_star(start, goal, environment):
+def a_star(start, goal, environment, cancel_event=None, heuristic=None):
     """
     Implements the A* pathfinding algorithm to find the optimal path
     from start to goal.
@@ -11,6 +12,11 @@ def a_star(start, goal, environment):
         start (tuple): Starting position (x, y)
         goal (tuple): Goal position (x, y)
         environment (Environment): The environment object containing obstacle information
+        cancel_event (threading.Event): Optional event that aborts the search when set
+        heuristic (callable): Optional function heuristic(goal) returning an array of
+                              shape grid_size with a lower bound on the path cost from
+                              every cell to the goal (e.g. a LandmarkHeuristic); used
+                              where it is tighter than the straight-line distance
         
     Returns:
         list: List of coordinates representing the path from start to goal,
@@ -20,9 +26,15 @@ def a_star(start, goal, environment):
     start = (round(start[0]), round(start[1]))
     goal = (round(goal[0]), round(goal[1]))
     
-    # Define heuristic function (Euclidean distance)
-    def heuristic(a, b):
-        return np.sqrt((b[0] - a[0]) ** 2 + (b[1] - a[1]) ** 2)
+    # Lower bounds to the goal from every cell, if given
+    bounds = heuristic(goal) if heuristic is not None else None
+    
+    # Define heuristic function (Euclidean distance, or the lower bound if larger)
+    def estimate(a, b):
+        straight = np.sqrt((b[0] - a[0]) ** 2 + (b[1] - a[1]) ** 2)
+        if bounds is not None and 0 <= a[0] < bounds.shape[0] and 0 <= a[1] < bounds.shape[1]:
+            return max(straight, bounds[a])
+        return straight
     
     # Define possible movement directions (8-directional movement)
     directions = [
@@ -46,17 +58,21 @@ def a_star(start, goal, environment):
     
     # Dictionary to store f scores (g_score + heuristic)
     f_score = defaultdict(lambda: float('inf'))
-    f_score[start] = heuristic(start, goal)
+    f_score[start] = estimate(start, goal)
     
     # Dictionary to store the parent of each node
     came_from = {}
     
     # Add starting node to open set
-    heapq.heappush(open_set, (f_score[start], start))
+    heapq.heappush(open_set, (f_score[start], 0, start))
     
     while open_set:
+        # Stop early if the request was cancelled
+        if cancel_event is not None and cancel_event.is_set():
+            return []
+        
         # Get the node with the lowest f_score
-        current_f, current = heapq.heappop(open_set)
+        current_f, _, current = heapq.heappop(open_set)
         
         # If we've reached the goal, reconstruct and return the path
         if current == goal:
@@ -68,6 +84,10 @@ def a_star(start, goal, environment):
             path.reverse()
             return path
         
+        # Skip outdated queue entries of nodes already expanded
+        if current in closed_set:
+            continue
+        
         # Add current node to closed set
         closed_set.add(current)
         
@@ -97,16 +117,17 @@ def a_star(start, goal, environment):
                 # Record this path
                 came_from[neighbor] = current
                 g_score[neighbor] = tentative_g
-                f_score[neighbor] = g_score[neighbor] + heuristic(neighbor, goal)
+                f_score[neighbor] = g_score[neighbor] + estimate(neighbor, goal)
                 
-                # Add to open set if not already there
-                if neighbor not in [i[1] for i in open_set]:
-                    heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                # Add to open set; an older entry for the node is skipped when popped.
+                # Ties go to the node farther along, which the landmark bounds
+                # produce often
+                heapq.heappush(open_set, (f_score[neighbor], -tentative_g, neighbor))
     
     # If we get here, no path was found
     return []
 
-def dijkstra(start, goal, environment):
+def dijkstra(start, goal, environment, cancel_event=None):
     """
     Implements Dijkstra's algorithm to find the shortest path from start to goal.
     
@@ -114,6 +135,7 @@ def dijkstra(start, goal, environment):
         start (tuple): Starting position (x, y)
         goal (tuple): Goal position (x, y)
         environment (Environment): The environment object containing obstacle information
+        cancel_event (threading.Event): Optional event that aborts the search when set
         
     Returns:
         list: List of coordinates representing the path from start to goal,
@@ -142,6 +164,10 @@ def dijkstra(start, goal, environment):
     previous = {}
     
     while queue:
+        # Stop early if the request was cancelled
+        if cancel_event is not None and cancel_event.is_set():
+            return []
+        
         # Get the node with the smallest distance
         current_dist, current = heapq.heappop(queue)
         
@@ -187,3 +213,295 @@ def dijkstra(start, goal, environment):
     
     # If we get here, no path was found
     return []
+
+def theta_star(start, goal, environment, cancel_event=None):
+    """
+    Implements the Lazy Theta* any-angle pathfinding algorithm.
+    
+    Like A*, the search expands the 8-connected grid, but a node may take
+    any node with line of sight as its parent instead of a grid neighbor.
+    Line of sight is only verified when a node is expanded (the "lazy"
+    variant), which keeps the number of checks close to the number of
+    expansions. The result is a short list of straight-line waypoints.
+    
+    Args:
+        start (tuple): Starting position (x, y)
+        goal (tuple): Goal position (x, y)
+        environment (Environment): The environment object containing obstacle information
+        cancel_event (threading.Event): Optional event that aborts the search when set
+        
+    Returns:
+        list: List of waypoints from start to goal joined by collision-free
+              straight segments, or an empty list if no path is found
+    """
+    # Round the positions to grid coordinates
+    start = (round(start[0]), round(start[1]))
+    goal = (round(goal[0]), round(goal[1]))
+    
+    # Straight-line distance is both the heuristic and the edge cost
+    def distance(a, b):
+        return np.sqrt((b[0] - a[0]) ** 2 + (b[1] - a[1]) ** 2)
+    
+    # Define possible movement directions (8-directional movement)
+    directions = [
+        (0, 1),   # Up
+        (1, 0),   # Right
+        (0, -1),  # Down
+        (-1, 0),  # Left
+        (1, 1),   # Up-Right
+        (-1, 1),  # Up-Left
+        (1, -1),  # Down-Right
+        (-1, -1)  # Down-Left
+    ]
+    
+    open_set = [(distance(start, goal), start)]
+    closed_set = set()
+    g_score = {start: 0}
+    parent = {start: start}
+    
+    while open_set:
+        # Stop early if the request was cancelled
+        if cancel_event is not None and cancel_event.is_set():
+            return []
+        
+        current_f, current = heapq.heappop(open_set)
+        
+        # Skip stale queue entries
+        if current in closed_set:
+            continue
+        
+        # Lazily verify the line of sight assumed when the node was queued;
+        # if it is blocked, fall back to the best expanded grid neighbor.
+        # The start has no parent to check (it may itself be blocked)
+        if current != start and not environment.has_line_of_sight(parent[current], current):
+            best = None
+            for dx, dy in directions:
+                neighbor = (current[0] + dx, current[1] + dy)
+                if neighbor in closed_set:
+                    cost = g_score[neighbor] + distance(neighbor, current)
+                    if best is None or cost < best[0]:
+                        best = (cost, neighbor)
+            g_score[current], parent[current] = best
+        
+        # If we've reached the goal, reconstruct and return the waypoints
+        if current == goal:
+            path = [current]
+            while current != start:
+                current = parent[current]
+                path.append(current)
+            path.reverse()
+            return path
+        
+        closed_set.add(current)
+        
+        for dx, dy in directions:
+            neighbor = (current[0] + dx, current[1] + dy)
+            
+            if neighbor in closed_set:
+                continue
+            
+            if not environment.is_valid_position(neighbor):
+                continue
+            
+            # Optimistically connect the neighbor straight to our parent
+            ancestor = parent[current]
+            tentative_g = g_score[ancestor] + distance(ancestor, neighbor)
+            
+            if tentative_g < g_score.get(neighbor, float('inf')):
+                g_score[neighbor] = tentative_g
+                parent[neighbor] = ancestor
+                heapq.heappush(open_set, (tentative_g + distance(neighbor, goal), neighbor))
+    
+    # If we get here, no path was found
+    return []
+
+def ara_star_search(start, goal, environment, initial_weight=3.0, weight_step=0.5, deadline=None):
+    """
+    Implements Anytime Repairing A* (ARA*) as a generator of improving paths.
+    
+    A weighted A* search with an inflated heuristic finds a first path
+    quickly. The weight is then lowered step by step and the search is
+    repaired (reusing all g scores) to publish better paths, until the
+    path is provably optimal or the deadline passes.
+    
+    Args:
+        start (tuple): Starting position (x, y)
+        goal (tuple): Goal position (x, y)
+        environment (Environment): The environment object containing obstacle information
+        initial_weight (float): Heuristic weight of the first search (>= 1)
+        weight_step (float): Amount the weight is lowered after each solution
+        deadline (float): Optional time.perf_counter() value at which to stop
+        
+    Yields:
+        tuple: (path, bound) each time a path is found, where bound is the
+               factor by which the path may exceed the optimal path cost
+    """
+    # Round the positions to grid coordinates
+    start = (round(start[0]), round(start[1]))
+    goal = (round(goal[0]), round(goal[1]))
+    
+    # Octile distance is admissible and consistent for the 8-connected costs below
+    def heuristic(a):
+        dx, dy = abs(goal[0] - a[0]), abs(goal[1] - a[1])
+        return max(dx, dy) + 0.414 * min(dx, dy)
+    
+    # Define possible movement directions (8-directional movement)
+    directions = [
+        (0, 1),   # Up
+        (1, 0),   # Right
+        (0, -1),  # Down
+        (-1, 0),  # Left
+        (1, 1),   # Up-Right
+        (-1, 1),  # Up-Left
+        (1, -1),  # Down-Right
+        (-1, -1)  # Down-Left
+    ]
+    
+    weight = max(initial_weight, 1.0)
+    g_score = defaultdict(lambda: float('inf'))
+    g_score[start] = 0
+    came_from = {}
+    
+    def key(node):
+        return g_score[node] + weight * heuristic(node)
+    
+    open_set = [(key(start), start)]
+    closed_set = set()
+    incons = set()
+    published = None
+    
+    def pop_stale():
+        # Discard queue entries for expanded nodes or outdated keys
+        while open_set and (open_set[0][1] in closed_set or open_set[0][0] != key(open_set[0][1])):
+            heapq.heappop(open_set)
+    
+    while True:
+        # Expand nodes until no queued node can improve the goal
+        pop_stale()
+        while open_set and g_score[goal] > open_set[0][0]:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            
+            current_key, current = heapq.heappop(open_set)
+            closed_set.add(current)
+            
+            for dx, dy in directions:
+                neighbor = (current[0] + dx, current[1] + dy)
+                
+                if not environment.is_valid_position(neighbor):
+                    continue
+                
+                # Diagonal movement costs more
+                tentative_g = g_score[current] + (1.414 if dx != 0 and dy != 0 else 1)
+                
+                if tentative_g < g_score[neighbor]:
+                    g_score[neighbor] = tentative_g
+                    came_from[neighbor] = current
+                    
+                    # Expanded nodes are revisited in the next, less greedy search
+                    if neighbor in closed_set:
+                        incons.add(neighbor)
+                    else:
+                        heapq.heappush(open_set, (key(neighbor), neighbor))
+            
+            pop_stale()
+        
+        # No path exists
+        if g_score[goal] == float('inf'):
+            return
+        
+        # Publish the path together with its suboptimality bound
+        path = [goal]
+        while path[-1] in came_from:
+            path.append(came_from[path[-1]])
+        path.reverse()
+        
+        frontier = [g_score[n] + heuristic(n) for _, n in open_set if n not in closed_set]
+        frontier += [g_score[n] + heuristic(n) for n in incons]
+        bound = min(weight, g_score[goal] / min(frontier)) if frontier else 1.0
+        bound = max(bound, 1.0)
+        
+        # Only report solutions that improved the path or tightened the bound
+        if published != (g_score[goal], bound):
+            published = (g_score[goal], bound)
+            yield path, bound
+        
+        if bound <= 1.0:
+            return
+        
+        # Lower the weight and repair the search from the inconsistent nodes
+        weight = max(1.0, weight - weight_step)
+        nodes = {n for _, n in open_set if n not in closed_set} | incons
+        open_set = [(key(n), n) for n in nodes]
+        heapq.heapify(open_set)
+        closed_set = set()
+        incons = set()
+
+def ara_star(start, goal, environment, time_budget=0.1, initial_weight=3.0, weight_step=0.5):
+    """
+    Runs ARA* for at most time_budget seconds and returns the best path found.
+    
+    Args:
+        start (tuple): Starting position (x, y)
+        goal (tuple): Goal position (x, y)
+        environment (Environment): The environment object containing obstacle information
+        time_budget (float): Planning time budget in seconds
+        initial_weight (float): Heuristic weight of the first search (>= 1)
+        weight_step (float): Amount the weight is lowered after each solution
+        
+    Returns:
+        tuple: (path, bound) where path is the best path found (an empty list
+               if none was found in time) and bound is its suboptimality
+               bound (infinite if no path was found)
+    """
+    deadline = time.perf_counter() + time_budget
+    path, bound = [], float('inf')
+    for path, bound in ara_star_search(start, goal, environment, initial_weight, weight_step, deadline):
+        pass
+    return path, bound
+
+def cost_to_go(source, environment):
+    """
+    Computes the shortest 8-connected path cost from a source cell to every
+    cell of the grid (a full Dijkstra search without a goal).
+    
+    Args:
+        source (tuple): Source position (x, y)
+        environment (Environment): The environment object containing obstacle information
+        
+    Returns:
+        numpy.ndarray: Array of shape grid_size with the path cost to each
+                       cell, infinite for obstacles and unreachable cells
+    """
+    source = (round(source[0]), round(source[1]))
+    width, height = environment.grid_size
+    free = environment.grid != 1
+    
+    # Define possible movement directions (8-directional movement) and their costs
+    directions = [
+        (0, 1, 1), (1, 0, 1), (0, -1, 1), (-1, 0, 1),
+        (1, 1, 1.414), (-1, 1, 1.414), (1, -1, 1.414), (-1, -1, 1.414)
+    ]
+    
+    distance = np.full(environment.grid_size, np.inf)
+    if not (0 <= source[0] < width and 0 <= source[1] < height):
+        return distance
+    distance[source] = 0
+    queue = [(0, source)]
+    
+    while queue:
+        current_dist, (x, y) = heapq.heappop(queue)
+        
+        # Skip outdated queue entries
+        if current_dist > distance[x, y]:
+            continue
+        
+        for dx, dy, weight in directions:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height and free[nx, ny]:
+                new_dist = current_dist + weight
+                if new_dist < distance[nx, ny]:
+                    distance[nx, ny] = new_dist
+                    heapq.heappush(queue, (new_dist, (nx, ny)))
+    
+    return distance
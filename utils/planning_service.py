@@ -0,0 +1,95 @@
+import inspect
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+class PlanningService:
+    """
+    Runs path planners on a background worker thread so the caller (e.g. the
+    Streamlit script) keeps rendering while a plan is in flight.
+
+    Only the most recent request matters: submitting a new request cancels
+    the previous one. Several services (e.g. one per session) can share one
+    executor, each keeping its own request slot. Planners that accept a
+    `cancel_event` argument stop their search as soon as they are cancelled;
+    the results of other planners are discarded.
+    """
+
+    def __init__(self, max_workers=1, executor=None):
+        """
+        Initialize the planning service.
+
+        Args:
+            max_workers (int): Number of worker threads, if the service creates its own executor
+            executor (concurrent.futures.Executor): Optional shared executor; it is
+                                                    not shut down by shutdown()
+        """
+        self._owns_executor = executor is None
+        self._executor = executor if executor is not None else \
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="planner")
+        self._lock = threading.Lock()
+        self._request = None  # (key, future, cancel_event) of the latest request
+
+    def request(self, planner, start, goal, environment, **kwargs):
+        """
+        Submit a planning request, cancelling any previous one.
+
+        The planner works on a copy of the environment, so the map can be
+        edited while the plan is computed. A request identical to the one in
+        flight (same planner, start, goal and map version) is not resubmitted.
+
+        Args:
+            planner (callable): Planner called as planner(start, goal, environment, **kwargs)
+            start (tuple): Starting position (x, y)
+            goal (tuple): Goal position (x, y)
+            environment (Environment): The environment to plan in
+            **kwargs: Extra keyword arguments for the planner
+
+        Returns:
+            concurrent.futures.Future: Future resolving to the planner's result,
+                                       or raising CancelledError if cancelled
+        """
+        key = (planner, tuple(start), tuple(goal), environment.version)
+
+        with self._lock:
+            if self._request is not None and self._request[0] == key:
+                return self._request[1]
+            self._cancel_locked()
+
+            cancel_event = threading.Event()
+            if "cancel_event" in inspect.signature(planner).parameters:
+                kwargs["cancel_event"] = cancel_event
+
+            future = self._executor.submit(self._run, planner, start, goal,
+                                           environment.copy(), cancel_event, kwargs)
+            self._request = (key, future, cancel_event)
+            return future
+
+    def cancel(self):
+        """
+        Cancel the request in flight, if any.
+        """
+        with self._lock:
+            self._cancel_locked()
+
+    def shutdown(self):
+        """
+        Cancel pending work and stop the worker threads (unless the executor is shared).
+        """
+        self.cancel()
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    def _cancel_locked(self):
+        if self._request is not None:
+            _, future, cancel_event = self._request
+            cancel_event.set()
+            future.cancel()
+            self._request = None
+
+    @staticmethod
+    def _run(planner, start, goal, environment, cancel_event, kwargs):
+        result = planner(start, goal, environment, **kwargs)
+        # Results of cancelled requests are stale, never hand them out
+        if cancel_event.is_set():
+            raise CancelledError()
+        return result
@@ -0,0 +1,578 @@
+import numpy as np
+import heapq
+import math
+
+from utils.environment import Environment
+
+def morton_codes(x, y):
+    """
+    Interleave the bits of cell coordinates into Morton (Z-order) codes.
+    Every square block of 2^k x 2^k cells aligned to its size covers one
+    contiguous range of 4^k codes.
+
+    Args:
+        x (numpy.ndarray): Cell x coordinates (non-negative, below 2^32)
+        y (numpy.ndarray): Cell y coordinates (non-negative, below 2^32)
+
+    Returns:
+        numpy.ndarray: Morton codes as uint64
+    """
+    def spread(v):
+        v = np.asarray(v).astype(np.uint64)
+        for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                            (2, 0x3333333333333333), (1, 0x5555555555555555)):
+            v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+        return v
+    return spread(x) | (spread(y) << np.uint64(1))
+
+def _compact(code):
+    # Inverse of the bit spreading in morton_codes
+    v = code & np.uint64(0x5555555555555555)
+    for shift, mask in ((1, 0x3333333333333333), (2, 0x0F0F0F0F0F0F0F0F), (4, 0x00FF00FF00FF00FF),
+                        (8, 0x0000FFFF0000FFFF), (16, 0x00000000FFFFFFFF)):
+        v = (v | (v >> np.uint64(shift))) & np.uint64(mask)
+    return v.astype(np.int64)
+
+# Spread bits of every byte value, for Morton codes of single cells in pure Python
+_SPREAD_BYTE = [int(v) for v in morton_codes(np.arange(256), np.zeros(256, dtype=int))]
+
+def _morton(x, y):
+    # Morton code of one cell, without the overhead of array operations
+    code = 0
+    for shift in (0, 8, 16, 24):
+        code |= (_SPREAD_BYTE[(x >> shift) & 255] | (_SPREAD_BYTE[(y >> shift) & 255] << 1)) << (2 * shift)
+    return code
+
+def _paint(x, y, levels, occupied, depth):
+    """
+    Rasterize leaves covering a square of 2^depth cells, coarse to fine:
+    upsample the blocks painted so far, then paint the leaves of the current
+    level over them.
+
+    Args:
+        x (numpy.ndarray): Lowest cell x of every leaf, relative to the square
+        y (numpy.ndarray): Lowest cell y of every leaf, relative to the square
+        levels (numpy.ndarray): Level of every leaf
+        occupied (numpy.ndarray): Whether every leaf is blocked
+        depth (int): Level of the square
+
+    Returns:
+        numpy.ndarray: Boolean array of shape (2^depth, 2^depth)
+    """
+    dense = np.zeros((1, 1), dtype=bool)
+    for level in range(depth, -1, -1):
+        if level < depth:
+            dense = dense.repeat(2, axis=0).repeat(2, axis=1)
+        at_level = levels == level
+        dense[x[at_level] >> level, y[at_level] >> level] = occupied[at_level]
+    return dense
+
+def _linear_quadtree(occupied, depth):
+    """
+    Build the leaves of a square of 2^depth cells bottom-up. A block is a
+    leaf when it is uniform and its parent is not, so leaves are found as
+    the uniform children of mixed blocks and the work per level scales with
+    the mixed blocks.
+
+    Returns:
+        tuple: (codes, levels, values) of the leaves sorted by Morton code,
+               with codes relative to the square's lowest cell
+    """
+    # (all blocked, any blocked) for the blocks of every level
+    pyramid = [(occupied, occupied)]
+    for level in range(1, depth + 1):
+        all_blocked, any_blocked = pyramid[-1]
+        all_blocked = all_blocked[0::2] & all_blocked[1::2]
+        any_blocked = any_blocked[0::2] | any_blocked[1::2]
+        pyramid.append((all_blocked[:, 0::2] & all_blocked[:, 1::2],
+                        any_blocked[:, 0::2] | any_blocked[:, 1::2]))
+
+    # The whole square is a leaf if it is uniform
+    top_all, top_any = pyramid[-1]
+    if top_all[0, 0] == top_any[0, 0]:
+        codes, levels, values = [np.zeros(1, dtype=np.uint64)], [np.zeros(1, dtype=np.uint8) + depth], [top_any[0]]
+    else:
+        codes, levels, values = [], [], []
+
+    for level in range(depth - 1, -1, -1):
+        parent_all, parent_any = pyramid[level + 1]
+        px, py = np.nonzero(parent_all != parent_any)
+        # The four children of every mixed parent
+        bx = (px[:, None] * 2 + np.array([0, 1, 0, 1])).ravel()
+        by = (py[:, None] * 2 + np.array([0, 0, 1, 1])).ravel()
+        all_blocked, any_blocked = pyramid[level]
+        leaf = all_blocked[bx, by] == any_blocked[bx, by]
+        bx, by = bx[leaf], by[leaf]
+        codes.append(morton_codes(bx << level, by << level))
+        levels.append(np.full(len(bx), level, dtype=np.uint8))
+        values.append(any_blocked[bx, by])
+
+    codes = np.concatenate(codes)
+    order = np.argsort(codes)
+    return codes[order], np.concatenate(levels)[order], np.concatenate(values)[order]
+
+class QuadtreeEnvironment(Environment):
+    """
+    Environment that stores occupancy in a region quadtree instead of a
+    dense grid, so memory and edits scale with the number of uniform
+    regions rather than with the area of the map.
+
+    The tree is kept as a linear quadtree: its leaves (square blocks that
+    are entirely free or entirely blocked) sorted by Morton code. Point
+    queries are a binary search over the leaves, for single cells or whole
+    batches at once, and edits only split and merge the leaves of the
+    blocks they touch. Cells of the power-of-two root square beyond the map
+    count as blocked. The `grid` attribute is a dense read-only adapter for
+    code that reads the grid directly, rasterized only when it is read and
+    then kept until the next edit.
+    """
+
+    def __init__(self, grid_size=(20, 20)):
+        """
+        Initialize an empty environment.
+
+        Args:
+            grid_size (tuple): Size of the grid as (width, height)
+        """
+        self.depth = max(int(math.ceil(math.log2(max(max(grid_size), 1)))), 0)
+        self._dense = None  # (version, grid) cache for the grid adapter
+        self._leaves = None  # (codes, leaves) cache for leaves()
+        super().__init__(grid_size)
+
+    @classmethod
+    def from_grid(cls, grid):
+        """
+        Build a quadtree environment from a dense grid.
+
+        Args:
+            grid (numpy.ndarray): 2D array with 1 for obstacles
+
+        Returns:
+            QuadtreeEnvironment: Environment with the same obstacles
+        """
+        environment = cls(grid_size=grid.shape)
+        environment.grid = grid
+        return environment
+
+    @property
+    def nbytes(self):
+        # Memory held by the leaves and the dense adapter, for the derived-structure cache budget
+        dense = self._dense[1].nbytes if self._dense is not None else 0
+        return self.codes.nbytes + self.levels.nbytes + self.occupied.nbytes + dense
+
+    @property
+    def grid(self):
+        """
+        Dense view of the map (1 = obstacle), rasterized from the leaves once
+        per map version. Read-only: edit the map through add_obstacle and
+        the other Environment methods.
+        """
+        if self._dense is None or self._dense[0] != self.version:
+            x, y, _, occupied = self.leaves()
+            dense = _paint(x, y, self.levels, occupied, self.depth)
+            dense = dense[:self.grid_size[0], :self.grid_size[1]].astype(int)
+            dense.flags.writeable = False
+            self._dense = (self.version, dense)
+        return self._dense[1]
+
+    @grid.setter
+    def grid(self, grid):
+        self._build(np.asarray(grid))
+
+    def _build(self, grid):
+        """
+        Build the leaves of the whole tree from a dense grid.
+        """
+        size = 1 << self.depth
+        occupied = np.ones((size, size), dtype=bool)
+        occupied[:grid.shape[0], :grid.shape[1]] = grid == 1
+        self.codes, self.levels, self.occupied = _linear_quadtree(occupied, self.depth)
+        self._dense = None
+
+    def leaves(self):
+        """
+        Returns:
+            tuple: (x, y, size, occupied) arrays describing every leaf block,
+                   where (x, y) is the block's lowest cell
+        """
+        # Edits replace the leaf arrays, so their identity tells if the cache is current
+        if self._leaves is None or self._leaves[0] is not self.codes:
+            sizes = np.left_shift(1, self.levels.astype(np.int64))
+            x = _compact(self.codes)
+            y = _compact(self.codes >> np.uint64(1))
+            self._leaves = (self.codes, (x, y, sizes, self.occupied))
+        return self._leaves[1]
+
+    def leaf_index(self, cells):
+        """
+        Find the leaf containing each cell.
+
+        Args:
+            cells (numpy.ndarray): Cell coordinates, shape (..., 2), inside the root square
+
+        Returns:
+            numpy.ndarray: Leaf indices, shape (...)
+        """
+        cells = np.asarray(cells)
+        codes = morton_codes(cells[..., 0], cells[..., 1])
+        return np.searchsorted(self.codes, codes, side='right') - 1
+
+    def _search(self, code, side):
+        # Binary search for one Morton code; a numpy scalar avoids slow conversion of Python ints
+        return int(self.codes.searchsorted(np.uint64(code), side))
+
+    def _leaf_at(self, x, y):
+        # Index of the leaf containing one cell
+        return self._search(_morton(x, y), 'right') - 1
+
+    def is_valid_position(self, position):
+        """
+        Check if a position is valid (within bounds and not an obstacle),
+        with a binary search over the leaves.
+
+        Args:
+            position (tuple): Position (x, y) to check
+
+        Returns:
+            bool: True if position is valid, False otherwise
+        """
+        x, y = int(round(position[0])), int(round(position[1]))
+        if x < 0 or x >= self.grid_size[0] or y < 0 or y >= self.grid_size[1]:
+            return False
+        return not self.occupied[self._leaf_at(x, y)]
+
+    def _occupancy_window(self, lo, hi):
+        """
+        Return a boolean obstacle mask for the cells lo..hi (inclusive), with
+        cells outside the grid marked as blocked, painted from the leaves of
+        the few aligned blocks covering the window.
+        """
+        window = np.ones((hi[0] - lo[0] + 1, hi[1] - lo[1] + 1), dtype=bool)
+        x0, y0 = max(lo[0], 0), max(lo[1], 0)
+        x1 = min(hi[0], self.grid_size[0] - 1)
+        y1 = min(hi[1], self.grid_size[1] - 1)
+        if x0 > x1 or y0 > y1:
+            return window
+
+        # Blocks as large as the window: at most two along each axis
+        level = max(int(math.ceil(math.log2(max(x1 - x0 + 1, y1 - y0 + 1)))), 0)
+        size = 1 << level
+        for bx in range(x0 >> level << level, x1 + 1, size):
+            for by in range(y0 >> level << level, y1 + 1, size):
+                block = self._block(bx, by, level)
+                # Overlap of the block with the window, in grid coordinates
+                ox0, oy0 = max(bx, x0), max(by, y0)
+                ox1, oy1 = min(bx + size, x1 + 1), min(by + size, y1 + 1)
+                window[ox0 - lo[0]:ox1 - lo[0], oy0 - lo[1]:oy1 - lo[1]] = \
+                    block[ox0 - bx:ox1 - bx, oy0 - by:oy1 - by] if block.ndim else block
+        return window
+
+    def _block(self, bx, by, level):
+        """
+        Occupancy of an aligned block of 2^level cells: a single boolean if
+        one leaf covers it, otherwise a boolean array painted from its leaves.
+        """
+        start = _morton(bx, by)
+        i = self._leaf_at(bx, by)
+        if self.levels[i] >= level:
+            return np.bool_(self.occupied[i])
+        i1 = self._search(start + (1 << (2 * level)), 'left')
+        codes = self.codes[i:i1]
+        return _paint(_compact(codes) - bx, _compact(codes >> np.uint64(1)) - by,
+                      self.levels[i:i1], self.occupied[i:i1], level)
+
+    def are_valid_positions(self, positions):
+        """
+        Vectorised version of is_valid_position for an array of points.
+
+        Args:
+            positions (numpy.ndarray): Points to check, shape (..., 2)
+
+        Returns:
+            numpy.ndarray: Boolean array of shape (...), True where valid
+        """
+        cells = np.rint(np.asarray(positions, dtype=float)).astype(np.int64)
+        x, y = cells[..., 0], cells[..., 1]
+        inside = (x >= 0) & (x < self.grid_size[0]) & (y >= 0) & (y < self.grid_size[1])
+        clamped = np.stack([np.clip(x, 0, self.grid_size[0] - 1), np.clip(y, 0, self.grid_size[1] - 1)], axis=-1)
+        return inside & ~self.occupied[self.leaf_index(clamped)]
+
+    def _replace(self, i0, i1, codes, levels, values):
+        # Replace leaves i0..i1 (exclusive) with new ones; arrays are never
+        # modified in place, so copies can share them
+        self.codes = np.concatenate([self.codes[:i0], np.asarray(codes, dtype=np.uint64), self.codes[i1:]])
+        self.levels = np.concatenate([self.levels[:i0], np.asarray(levels, dtype=np.uint8), self.levels[i1:]])
+        self.occupied = np.concatenate([self.occupied[:i0], np.asarray(values, dtype=bool), self.occupied[i1:]])
+
+    def _split(self, code, level):
+        """
+        Make the block of the given level starting at code a union of
+        leaves: if a larger leaf covers it, split that leaf, keeping the
+        three sibling blocks at every level in between.
+        """
+        i = self._search(code, 'right') - 1
+        leaf_level, old = int(self.levels[i]), bool(self.occupied[i])
+        if leaf_level <= level:
+            return
+        new = [(code, level, old)]
+        for sub in range(level, leaf_level):
+            parent = code & ~((4 << (2 * sub)) - 1)
+            own = code & ~((1 << (2 * sub)) - 1)
+            new.extend((parent + q * (1 << (2 * sub)), sub, old) for q in range(4)
+                       if parent + q * (1 << (2 * sub)) != own)
+        new.sort()
+        self._replace(i, i + 1, *zip(*new))
+
+    def _merge(self, code, level):
+        """
+        Replace uniform parent blocks above the block of the given level
+        starting at code by single leaves.
+        """
+        for parent_level in range(level + 1, self.depth + 1):
+            start = code & ~((1 << (2 * parent_level)) - 1)
+            end = start + (1 << (2 * parent_level))
+            i0 = self._search(start, 'left')
+            i1 = self._search(end, 'left')
+            values = self.occupied[i0:i1]
+            if i1 - i0 <= 1 or not np.all(values == values[0]):
+                break
+            self._replace(i0, i1, [start], [parent_level], [values[0]])
+
+    def _set_cell(self, x, y, value):
+        """
+        Set one cell, splitting its leaf down to the cell and merging blocks
+        back up while they are uniform.
+        """
+        code = _morton(x, y)
+        if self.occupied[self._leaf_at(x, y)] == value:
+            return
+        self._split(code, 0)
+        i = self._leaf_at(x, y)
+        self._replace(i, i + 1, [code], [0], [value])
+        self._merge(code, 0)
+
+    def _write_block(self, bx, by, level, origin, changed, obstacles):
+        """
+        Apply the part of a bulk edit inside one aligned block: paint the
+        block from its leaves, write the cells and rebuild only its leaves.
+        """
+        start = _morton(bx, by)
+        size = 1 << level
+        self._split(start, level)
+        dense = self._block(bx, by, level)
+        if not dense.ndim:
+            dense = np.full((size, size), bool(dense))
+
+        # Overlap of the block with the edit window, in grid coordinates
+        x0, y0 = max(bx, origin[0]), max(by, origin[1])
+        x1 = min(bx + size, origin[0] + changed.shape[0])
+        y1 = min(by + size, origin[1] + changed.shape[1])
+        edit = (slice(x0 - origin[0], x1 - origin[0]), slice(y0 - origin[1], y1 - origin[1]))
+        target = dense[x0 - bx:x1 - bx, y0 - by:y1 - by]
+        target[changed[edit]] = obstacles[edit][changed[edit]]
+
+        codes, levels, values = _linear_quadtree(dense, level)
+        i0 = self._search(start, 'left')
+        i1 = self._search(start + (1 << (2 * level)), 'left')
+        self._replace(i0, i1, codes + np.uint64(start), levels, values)
+        self._merge(start, level)
+
+    def _write_cells(self, origin, changed, obstacles):
+        """
+        Write a bulk edit block by block. The block size is chosen so that
+        the cells painted plus the leaf arrays rewritten per block are
+        fewest: single cells for scattered edits, a few large blocks for
+        compact ones.
+        """
+        xs, ys = np.nonzero(changed)
+        blocks = ((xs + origin[0]) << 32) | (ys + origin[1])
+        best = None
+        for level in range(self.depth + 1):
+            # The blocks of a level are the parents of the previous level's blocks
+            if level:
+                blocks = np.unique(((blocks >> 33) << 32) | ((blocks & 0xFFFFFFFF) >> 1))
+            cost = len(blocks) * ((1 << (2 * level)) + len(self.codes))
+            if best is None or cost < best[0]:
+                best = (cost, level, blocks)
+            if len(blocks) == 1:
+                break
+        _, level, blocks = best
+        for block in blocks:
+            bx, by = int(block >> 32) << level, int(block & 0xFFFFFFFF) << level
+            self._write_block(bx, by, level, origin, changed, obstacles)
+
+    def add_obstacle(self, position):
+        """
+        Add an obstacle at the specified position.
+
+        Args:
+            position (tuple): Position (x, y) to place the obstacle
+        """
+        x, y = int(position[0]), int(position[1])
+        if 0 <= x < self.grid_size[0] and 0 <= y < self.grid_size[1]:
+            self._set_cell(x, y, True)
+            self._changed((x, y), (x, y), 1)
+
+    def remove_obstacle(self, position):
+        """
+        Remove an obstacle from the specified position.
+
+        Args:
+            position (tuple): Position (x, y) to remove the obstacle from
+        """
+        x, y = int(position[0]), int(position[1])
+        if 0 <= x < self.grid_size[0] and 0 <= y < self.grid_size[1]:
+            self._set_cell(x, y, False)
+            self._changed((x, y), (x, y), 1)
+
+    def clear_obstacles(self):
+        """
+        Remove all obstacles from the grid.
+        """
+        self._build(np.zeros(self.grid_size, dtype=bool))
+        self._changed((0, 0), (self.grid_size[0] - 1, self.grid_size[1] - 1))
+
+    def load_map(self, map_data):
+        """
+        Load a map from a 2D array.
+
+        Args:
+            map_data (numpy.ndarray): 2D array representing the map
+        """
+        if map_data.shape != self.grid_size:
+            raise ValueError(f"Map size {map_data.shape} does not match grid size {self.grid_size}")
+        self._build(map_data)
+        self._changed((0, 0), (self.grid_size[0] - 1, self.grid_size[1] - 1))
+        self._loaded_version = self.version
+
+    def copy(self):
+        """
+        Create an independent copy of the environment. The leaf arrays are
+        shared, since edits always replace them instead of writing into them.
+
+        Returns:
+            QuadtreeEnvironment: A new environment with the same map and version
+        """
+        environment = QuadtreeEnvironment.__new__(QuadtreeEnvironment)
+        environment.__dict__.update(self.__dict__)
+        environment._subscribers = []
+        environment._field_base = None
+        environment._dirty = None
+        return environment
+
+def _portals(tree, leaf):
+    """
+    Edge-adjacent free leaves of a leaf and the midpoint of each shared edge,
+    found with one batched lookup of the cells just outside all four sides.
+    """
+    leaf_x, leaf_y, leaf_size, occupied = tree.leaves()
+    x0, y0, size = int(leaf_x[leaf]), int(leaf_y[leaf]), int(leaf_size[leaf])
+    span = np.arange(size)
+
+    # Cells outside the right, left, top and bottom sides, and each side's coordinate
+    xs = np.concatenate([np.full(size, x0 + size), np.full(size, x0 - 1), x0 + span, x0 + span])
+    ys = np.concatenate([y0 + span, y0 + span, np.full(size, y0 + size), np.full(size, y0 - 1)])
+    sides = np.repeat(np.arange(4), size)
+    edges = np.array([x0 + size - 0.5, x0 - 0.5, y0 + size - 0.5, y0 - 0.5])
+    inside = (xs >= 0) & (xs < tree.grid_size[0]) & (ys >= 0) & (ys < tree.grid_size[1])
+    xs, ys, sides = xs[inside], ys[inside], sides[inside]
+
+    neighbors = tree.leaf_index(np.stack([xs, ys], axis=-1))
+    free = ~occupied[neighbors]
+    xs, ys, sides, neighbors = xs[free], ys[free], sides[free], neighbors[free]
+
+    # A neighbor's cells along a side are contiguous: the portal spans its first to last cell
+    result = {}
+    keys = neighbors * 4 + sides
+    _, first = np.unique(keys, return_index=True)
+    _, last = np.unique(keys[::-1], return_index=True)
+    last = len(keys) - 1 - last
+    for i, j in zip(first, last):
+        side = sides[i]
+        if side < 2:
+            result[int(neighbors[i])] = (edges[side], (ys[i] + ys[j]) / 2)
+        else:
+            result[int(neighbors[i])] = ((xs[i] + xs[j]) / 2, edges[side])
+    return result
+
+def quadtree_a_star(start, goal, environment, cancel_event=None):
+    """
+    Implements A* over the free leaves of a region quadtree, so large open
+    areas are expanded as single nodes instead of cell by cell.
+
+    Leaves are connected when they share an edge, and the path passes
+    through the midpoint of every shared edge (portal). Within a free leaf
+    straight lines stay free, so the waypoints can be followed directly.
+    A plain Environment is converted to a quadtree once per map content.
+
+    Args:
+        start (tuple): Starting position (x, y)
+        goal (tuple): Goal position (x, y)
+        environment (Environment): The environment object containing obstacle information
+        cancel_event (threading.Event): Optional event that aborts the search when set
+
+    Returns:
+        list: List of (x, y) waypoints from start to goal, or an empty list
+              if no path is found
+    """
+    if isinstance(environment, QuadtreeEnvironment):
+        tree = environment
+    else:
+        tree = environment.derived("quadtree", lambda: QuadtreeEnvironment.from_grid(environment.grid))
+
+    start = (float(round(start[0])), float(round(start[1])))
+    goal = (float(round(goal[0])), float(round(goal[1])))
+    # Batched lookup, so a cached tree never rasterizes its dense adapter
+    if not tree.are_valid_positions(np.array([start, goal])).all():
+        return []
+
+    leaf_x, leaf_y, leaf_size, _ = tree.leaves()
+    start_leaf, goal_leaf = (int(i) for i in tree.leaf_index(np.array([start, goal], dtype=np.int64)))
+
+    # Every node is a leaf, entered at the point stored for it
+    points = {start_leaf: start}
+    g_scores = {start_leaf: 0.0}
+    parents = {start_leaf: None}
+    open_set = [(math.dist(start, goal), start_leaf)]
+    closed_set = set()
+
+    while open_set:
+        if cancel_event is not None and cancel_event.is_set():
+            return []
+
+        _, leaf = heapq.heappop(open_set)
+        if leaf in closed_set:
+            continue
+        closed_set.add(leaf)
+
+        if leaf == goal_leaf:
+            # Walk back through the portals; when two consecutive waypoints lie
+            # on the same leaf side, pass through the leaf's center instead of
+            # running along the side
+            chain = []
+            while leaf is not None:
+                chain.append(leaf)
+                leaf = parents[leaf]
+            chain.reverse()
+            path = [start]
+            for node, following in zip(chain, chain[1:] + [None]):
+                exit_point = points[following] if following is not None else goal
+                entry = path[-1]
+                if (entry[0] == exit_point[0] and entry[0] % 1) or (entry[1] == exit_point[1] and entry[1] % 1):
+                    size = int(leaf_size[node])
+                    path.append((leaf_x[node] + (size - 1) / 2, leaf_y[node] + (size - 1) / 2))
+                path.append(exit_point)
+            return [(float(x), float(y)) for x, y in path]
+
+        for neighbor, portal in _portals(tree, leaf).items():
+            if neighbor in closed_set:
+                continue
+            g = g_scores[leaf] + math.dist(points[leaf], portal)
+            if g < g_scores.get(neighbor, float('inf')):
+                g_scores[neighbor] = g
+                points[neighbor] = portal
+                parents[neighbor] = leaf
+                heapq.heappush(open_set, (g + math.dist(portal, goal), neighbor))
+
+    # If we get here, no path was found
+    return []
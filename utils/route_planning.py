@@ -0,0 +1,225 @@
+import numpy as np
+
+from utils.path_planning import cost_to_go
+
+# 8-connected moves and their costs, as used by cost_to_go
+_MOVES = [(0, 1, 1), (1, 0, 1), (0, -1, 1), (-1, 0, 1),
+          (1, 1, 1.414), (-1, 1, 1.414), (1, -1, 1.414), (-1, -1, 1.414)]
+
+def _cell(point):
+    return (round(point[0]), round(point[1]))
+
+def _field(cell, environment):
+    # One-to-many search from a stop, shared by every route (and Hybrid A*)
+    # planned on the same map
+    return environment.derived(("cost_to_go", cell), lambda: cost_to_go(cell, environment))
+
+def cost_matrix(points, environment, cancel_event=None):
+    """
+    Computes the shortest path cost between every pair of points.
+
+    Runs one full search per point except the first and reads the costs to
+    all other points from it. Searches are cached per map content, so after
+    the vehicle moves only the first point's row needs new lookups. Costs
+    are symmetric, so the first point (usually the vehicle) needs no search
+    of its own.
+
+    Args:
+        points (list): Positions (x, y); the first one is the route's start
+        environment (Environment): The environment object containing obstacle information
+        cancel_event (threading.Event): Optional event that aborts the computation when set
+
+    Returns:
+        numpy.ndarray: Matrix (N, N) of path costs, infinite where no path
+                       exists, or None if cancelled
+    """
+    cells = [_cell(point) for point in points]
+    xs, ys = np.array(cells).T
+    inside = (xs >= 0) & (xs < environment.grid_size[0]) & (ys >= 0) & (ys < environment.grid_size[1])
+    xs, ys = np.clip(xs, 0, environment.grid_size[0] - 1), np.clip(ys, 0, environment.grid_size[1] - 1)
+
+    costs = np.zeros((len(cells), len(cells)))
+    for j in range(1, len(cells)):
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        column = _field(cells[j], environment)[xs, ys]
+        costs[:, j] = np.where(inside, column, np.inf)
+    costs[1:, 0] = costs[0, 1:]
+    return costs
+
+def _route_cost(route, costs):
+    return float(sum(costs[a, b] for a, b in zip(route, route[1:])))
+
+def _two_opt(route, costs, movable_end):
+    """
+    Reverse sub-sequences of the route while that shortens it. Positions
+    0 and (unless movable_end) the last position stay fixed.
+    """
+    route = list(route)
+    last = len(route) - 1 if movable_end else len(route) - 2
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, last):
+            # Gain of reversing route[i..k] for every k at once
+            ks = np.arange(i + 1, last + 1)
+            a, b = route[i - 1], route[i]
+            c = np.array(route)[ks]
+            after = np.array([route[k + 1] if k + 1 < len(route) else -1 for k in ks])
+            has_after = after >= 0
+            removed = costs[a, b] + np.where(has_after, costs[c, np.maximum(after, 0)], 0)
+            added = costs[a, c] + np.where(has_after, costs[b, np.maximum(after, 0)], 0)
+            delta = added - removed
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                k = int(ks[best])
+                route[i:k + 1] = reversed(route[i:k + 1])
+                improved = True
+    return route
+
+def _or_opt(route, costs, movable_end):
+    """
+    Move segments of one to three stops (optionally reversed) to a cheaper
+    place in the route while that shortens it.
+    """
+    route = list(route)
+    improved = True
+    while improved:
+        improved = False
+        limit = len(route) if movable_end else len(route) - 1
+        for length in (1, 2, 3):
+            for i in range(1, limit - length + 1):
+                first, last = route[i], route[i + length - 1]
+                prev = route[i - 1]
+                after = route[i + length] if i + length < len(route) else None
+
+                # Saving of taking the segment out and closing the gap
+                removed = costs[prev, first]
+                if after is not None:
+                    removed += costs[last, after] - costs[prev, after]
+
+                # Cost of putting it back between rest[j - 1] and rest[j], for every j
+                # at once; j == len(rest) appends it at the (movable) end
+                rest = route[:i] + route[i + length:]
+                insert_limit = len(rest) + 1 if movable_end else len(rest)
+                js = np.array([j for j in range(1, insert_limit) if j != i], dtype=int)
+                if len(js) == 0:
+                    continue
+                u = np.array(rest)[js - 1]
+                v = np.array(rest)[np.minimum(js, len(rest) - 1)]
+                has_v = js < len(rest)
+                gap = np.where(has_v, costs[u, v], 0)
+                forward = costs[u, first] + np.where(has_v, costs[last, v], 0) - gap
+                backward = costs[u, last] + np.where(has_v, costs[first, v], 0) - gap
+
+                delta = np.minimum(forward, backward) - removed
+                best = int(np.argmin(delta))
+                if delta[best] < -1e-9:
+                    segment = route[i:i + length]
+                    if backward[best] < forward[best]:
+                        segment = segment[::-1]
+                    j = int(js[best])
+                    route = rest[:j] + segment + rest[j:]
+                    improved = True
+    return route
+
+def order_stops(costs, fixed_end=False):
+    """
+    Finds a short visiting order for the points of a cost matrix, starting
+    at point 0: nearest neighbor construction, then 2-opt and Or-opt
+    improvement until neither finds a shorter route.
+
+    Args:
+        costs (numpy.ndarray): Matrix (N, N) from cost_matrix()
+        fixed_end (bool): Whether the last point must be visited last (e.g. the goal)
+
+    Returns:
+        list: Indices of the points in visiting order, starting with 0; points
+              that cannot be reached from the start are left out
+    """
+    n = len(costs)
+    end = n - 1 if fixed_end and n > 1 else None
+    reachable = [i for i in range(1, n) if np.isfinite(costs[0, i]) and i != end]
+
+    # Nearest neighbor construction
+    route, remaining = [0], set(reachable)
+    while remaining:
+        nearest = min(remaining, key=lambda i: costs[route[-1], i])
+        route.append(nearest)
+        remaining.remove(nearest)
+    if end is not None and np.isfinite(costs[0, end]):
+        route.append(end)
+    movable_end = end is None or route[-1] != end
+
+    # Alternate both improvements until neither helps
+    while True:
+        before = _route_cost(route, costs)
+        route = _or_opt(_two_opt(route, costs, movable_end), costs, movable_end)
+        if _route_cost(route, costs) >= before - 1e-9:
+            return route
+
+def stitch_leg(start, field):
+    """
+    Follows a cost-to-go field downhill from a cell to the field's source.
+
+    Args:
+        start (tuple): Starting cell (x, y)
+        field (numpy.ndarray): Cost-to-go field of the leg's destination
+
+    Returns:
+        list: Cells from start to the destination, or an empty list if the
+              destination cannot be reached
+    """
+    x, y = start
+    if not np.isfinite(field[x, y]):
+        return []
+    width, height = field.shape
+    leg = [(x, y)]
+    while field[x, y] > 0:
+        # The neighbor on a shortest path has the lowest cost once the step is added
+        best, best_cost = None, field[x, y]
+        for dx, dy, weight in _MOVES:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height and field[nx, ny] + weight <= best_cost + 1e-6:
+                best, best_cost = (nx, ny), field[nx, ny] + weight
+        x, y = best
+        leg.append(best)
+    return leg
+
+def plan_route(start, goal, environment, stops=(), cancel_event=None):
+    """
+    Plans a path from start through every stop in a short visiting order,
+    ending at the goal.
+
+    The pairwise path costs come from one cached cost-to-go search per
+    stop, the order from order_stops() and every leg by walking down the
+    destination's cost-to-go field, so no extra searches are needed to
+    build the path.
+
+    Args:
+        start (tuple): Starting position (x, y) or pose (x, y, heading)
+        goal (tuple): Goal position (x, y), visited last; None to end at the last stop
+        environment (Environment): The environment object containing obstacle information
+        stops (list): Positions (x, y) to visit on the way
+        cancel_event (threading.Event): Optional event that aborts the search when set
+
+    Returns:
+        list: List of cells from start to goal through the reachable stops,
+              or an empty list if the goal cannot be reached
+    """
+    points = [start[:2]] + [tuple(stop[:2]) for stop in stops]
+    if goal is not None:
+        points.append(tuple(goal[:2]))
+    costs = cost_matrix(points, environment, cancel_event)
+    if costs is None:
+        return []
+    if goal is not None and not np.isfinite(costs[0, -1]):
+        return []
+
+    route = order_stops(costs, fixed_end=goal is not None)
+    cells = [_cell(points[i]) for i in route]
+    path = [cells[0]]
+    for origin, destination in zip(cells, cells[1:]):
+        leg = stitch_leg(origin, _field(destination, environment))
+        path.extend(leg[1:])
+    return path
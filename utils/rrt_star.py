@@ -0,0 +1,271 @@
+import numpy as np
+import math
+import time
+from collections import defaultdict
+
+class GridBucketIndex:
+    """
+    Spatial index for 2D points that hashes them into square buckets.
+
+    Supports incremental insertion, radius queries and nearest-neighbor
+    queries, all of which only look at the buckets around the query point.
+    """
+
+    def __init__(self, bucket_size, capacity=1024):
+        """
+        Initialize the index.
+
+        Args:
+            bucket_size (float): Side length of a bucket
+            capacity (int): Initial number of points to allocate space for
+        """
+        self.bucket_size = bucket_size
+        self.points = np.empty((capacity, 2))
+        self.count = 0
+        self.buckets = defaultdict(list)
+
+    def _bucket(self, point):
+        return (math.floor(point[0] / self.bucket_size), math.floor(point[1] / self.bucket_size))
+
+    def insert(self, point):
+        """
+        Add a point to the index.
+
+        Args:
+            point (tuple): Point (x, y)
+
+        Returns:
+            int: Index of the inserted point
+        """
+        if self.count == len(self.points):
+            self.points = np.concatenate([self.points, np.empty_like(self.points)])
+        index = self.count
+        self.points[index] = point
+        self.count += 1
+        self.buckets[self._bucket(point)].append(index)
+        return index
+
+    def _ring(self, center, ring):
+        # Indices of all points in the buckets at Chebyshev distance `ring`
+        bx, by = center
+        indices = []
+        for dx in range(-ring, ring + 1):
+            for dy in range(-ring, ring + 1):
+                if max(abs(dx), abs(dy)) == ring:
+                    indices.extend(self.buckets.get((bx + dx, by + dy), ()))
+        return indices
+
+    def near(self, point, radius):
+        """
+        Find all points within a radius.
+
+        Args:
+            point (tuple): Query point (x, y)
+            radius (float): Search radius
+
+        Returns:
+            numpy.ndarray: Indices of the points within radius
+        """
+        center = self._bucket(point)
+        reach = int(math.ceil(radius / self.bucket_size))
+        candidates = []
+        for ring in range(reach + 1):
+            candidates.extend(self._ring(center, ring))
+        candidates = np.asarray(candidates, dtype=int)
+        if len(candidates) == 0:
+            return candidates
+        distances = np.hypot(*(self.points[candidates] - point).T)
+        return candidates[distances <= radius]
+
+    def nearest(self, point):
+        """
+        Find the nearest point.
+
+        Args:
+            point (tuple): Query point (x, y)
+
+        Returns:
+            int: Index of the nearest point, or -1 if the index is empty
+        """
+        if self.count == 0:
+            return -1
+        center = self._bucket(point)
+        best, best_distance = -1, float('inf')
+        ring = 0
+        # Points in ring r + 1 are at least r bucket sizes away
+        while best_distance > (ring - 1) * self.bucket_size:
+            candidates = self._ring(center, ring)
+            if candidates:
+                distances = np.hypot(*(self.points[candidates] - point).T)
+                i = int(np.argmin(distances))
+                if distances[i] < best_distance:
+                    best, best_distance = candidates[i], distances[i]
+            ring += 1
+        return best
+
+def rrt_star(start, goal, environment, max_iterations=3000, time_budget=None, step_size=1.0,
+             goal_tolerance=0.5, goal_bias=0.05, informed=True, seed=None, cancel_event=None):
+    """
+    Implements the RRT* sampling-based planner in continuous coordinates.
+
+    Random samples grow a tree from the start; every new node picks the
+    cheapest collision-free parent among its neighbors and then rewires
+    neighbors through itself when that shortens their path. Once a path is
+    found, informed sampling restricts samples to the ellipse of points that
+    could still improve it. Neighbor lookups use a GridBucketIndex and all
+    candidate edges of a node are collision checked in one batch.
+
+    Args:
+        start (tuple): Starting position (x, y)
+        goal (tuple): Goal position (x, y)
+        environment (Environment): The environment object containing obstacle information
+        max_iterations (int): Maximum number of samples to draw
+        time_budget (float): Optional planning time budget in seconds
+        step_size (float): Maximum edge length
+        goal_tolerance (float): Distance at which a node may connect to the goal
+        goal_bias (float): Probability of sampling the goal itself
+        informed (bool): Whether to use informed sampling once a path exists
+        seed (int): Seed for the random sampler, for reproducible paths
+        cancel_event (threading.Event): Optional event that aborts the search when set
+
+    Returns:
+        list: List of (x, y) waypoints from start to goal, or an empty list
+              if no path is found within the budget
+    """
+    start = np.array(start[:2], dtype=float)
+    goal = np.array(goal[:2], dtype=float)
+    if not environment.is_valid_position(start) or not environment.is_valid_position(goal):
+        return []
+
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    rng = np.random.default_rng(seed)
+
+    # Sampling bounds cover every grid cell
+    low = np.array([-0.5, -0.5])
+    high = np.array(environment.grid_size, dtype=float) - 0.5
+
+    # Neighbor radius shrinks as the tree grows (RRT* connection radius for 2D)
+    area = float(np.prod(high - low))
+    gamma = math.sqrt(6 * area / math.pi)
+    max_radius = 3 * step_size
+
+    index = GridBucketIndex(max_radius)
+    index.insert(start)
+    parents = [-1]
+    costs = [0.0]
+    children = [[]]
+
+    # Nodes that can connect straight to the goal, with their distance to it
+    goal_nodes = []
+    goal_distances = []
+    best_goal_node, best_cost = -1, float('inf')
+
+    # Ellipse parameters for informed sampling
+    c_min = float(np.hypot(*(goal - start)))
+    center = (start + goal) / 2
+    angle = math.atan2(goal[1] - start[1], goal[0] - start[0])
+    rotation = np.array([[math.cos(angle), -math.sin(angle)],
+                         [math.sin(angle), math.cos(angle)]])
+
+    # Draw random numbers in chunks to avoid per-sample generator calls
+    chunk = 256
+    uniforms = rng.random((chunk, 3))
+    used = 0
+
+    for _ in range(max_iterations):
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        if cancel_event is not None and cancel_event.is_set():
+            return []
+
+        if used == chunk:
+            uniforms = rng.random((chunk, 3))
+            used = 0
+        u = uniforms[used]
+        used += 1
+
+        # Sample a point: the goal, the informed ellipse or the whole map
+        if u[0] < goal_bias:
+            sample = goal
+        elif informed and best_goal_node >= 0 and best_cost > c_min:
+            r = math.sqrt(u[1])
+            theta = 2 * math.pi * u[2]
+            axes = np.array([best_cost / 2, math.sqrt(best_cost ** 2 - c_min ** 2) / 2])
+            sample = center + rotation @ (axes * r * np.array([math.cos(theta), math.sin(theta)]))
+        else:
+            sample = low + u[1:] * (high - low)
+
+        # Steer from the nearest node towards the sample
+        nearest = index.nearest(sample)
+        origin = index.points[nearest]
+        offset = sample - origin
+        distance = math.hypot(offset[0], offset[1])
+        if distance < 1e-9:
+            continue
+        new_point = origin + offset * min(1.0, step_size / distance)
+
+        if not environment.is_valid_position(new_point):
+            continue
+
+        # Collision check all candidate edges to the neighborhood at once
+        n = index.count
+        radius = min(max_radius, gamma * math.sqrt(math.log(n + 1) / (n + 1)))
+        near = index.near(new_point, max(radius, step_size))
+        near_points = index.points[near]
+        clear = environment.segments_clear(near_points, np.broadcast_to(new_point, near_points.shape))
+        if not clear.any():
+            continue
+        near, near_points = near[clear], near_points[clear]
+        edge_costs = np.hypot(*(near_points - new_point).T)
+
+        # Choose the parent that gives the cheapest path
+        near_costs = np.array([costs[i] for i in near])
+        totals = near_costs + edge_costs
+        choice = int(np.argmin(totals))
+        parent = int(near[choice])
+
+        node = index.insert(new_point)
+        parents.append(parent)
+        costs.append(float(totals[choice]))
+        children.append([])
+        children[parent].append(node)
+
+        # Rewire neighbors whose path gets shorter through the new node
+        improved = costs[node] + edge_costs < near_costs - 1e-9
+        for neighbor, edge_cost in zip(near[improved], edge_costs[improved]):
+            neighbor = int(neighbor)
+            children[parents[neighbor]].remove(neighbor)
+            parents[neighbor] = node
+            children[node].append(neighbor)
+            delta = costs[node] + edge_cost - costs[neighbor]
+            stack = [neighbor]
+            while stack:
+                current = stack.pop()
+                costs[current] += delta
+                stack.extend(children[current])
+
+        # Try to connect the new node to the goal
+        to_goal = float(np.hypot(*(goal - new_point)))
+        if to_goal <= goal_tolerance and environment.has_line_of_sight(new_point, goal):
+            goal_nodes.append(node)
+            goal_distances.append(to_goal)
+
+        # Rewiring may also have improved paths through earlier goal nodes
+        if goal_nodes:
+            totals = [costs[i] + d for i, d in zip(goal_nodes, goal_distances)]
+            best = int(np.argmin(totals))
+            best_goal_node, best_cost = goal_nodes[best], totals[best]
+
+    if best_goal_node < 0:
+        return []
+
+    # Reconstruct the path by walking up the tree
+    path = [tuple(goal)]
+    node = best_goal_node
+    while node >= 0:
+        point = tuple(index.points[node])
+        if point != path[-1]:
+            path.append(point)
+        node = parents[node]
+    path.reverse()
+    return [(float(x), float(y)) for x, y in path]
@@ -1,101 +1,254 @@
 import numpy as np
 import math
+from functools import lru_cache
 
-def simulate_lidar(position, heading, environment, num_rays=12, max_range=5):
+@lru_cache(maxsize=None)
+def _num_steps(max_range, step_size):
+    """
+    Number of steps a ray takes to reach max range. Mirrors the accumulated
+    floating-point ray length of the original per-ray loop so readings are
+    unchanged by the batched implementation.
+    """
+    steps = 0
+    ray_length = 0
+    while ray_length < max_range:
+        ray_length += step_size
+        steps += 1
+    return max(steps, 1)
+
+def _march_rays(position, angles, environment, max_range, step_size=0.1):
+    """
+    Step a batch of rays outward from a position until each hits an obstacle
+    or reaches max range. All ray samples are checked in a single call to
+    Environment.are_valid_positions.
+
+    Args:
+        position (tuple or numpy.ndarray): Ray origin (x, y), or one origin per ray, shape (R, 2)
+        angles (numpy.ndarray): Ray angles in radians, shape (R,)
+        environment (Environment): The environment object containing obstacle information
+        max_range (float): Maximum ray length
+        step_size (float): Distance between consecutive samples along a ray
+
+    Returns:
+        tuple: (end_points, steps) where end_points (R, 2) are the positions
+               where each ray stopped and steps (R,) the number of steps taken
+    """
+    angles = np.asarray(angles, dtype=float)
+    num_steps = _num_steps(max_range, step_size)
+    origins = np.broadcast_to(np.asarray(position, dtype=float)[..., :2], (len(angles), 2))
+
+    # Sample every step of every ray at once, shape (R, num_steps, 2)
+    offsets = step_size * np.arange(1, num_steps + 1)
+    directions = np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+    samples = origins[:, None, :] + offsets[None, :, None] * directions[:, None, :]
+
+    # Each ray stops at its first invalid sample, or at the last one
+    blocked = ~environment.are_valid_positions(samples)
+    hit = blocked.any(axis=1)
+    last = np.where(hit, blocked.argmax(axis=1), num_steps - 1)
+
+    end_points = samples[np.arange(len(angles)), last]
+    return end_points, last + 1
+
+class SensorNoiseModel:
+    """
+    Measurement noise for range sensors: Gaussian range noise, angular
+    jitter of the rays, dropouts (no return, reported as max range) and
+    spurious short returns (dust, reflections).
+
+    Noise is applied as array operations over whole scans. The random
+    numbers come from the caller's numpy Generator, one per vehicle, so a
+    seeded run produces the same noisy readings every time. Every reading
+    consumes the same draws whatever the noise settings, so changing one
+    setting does not shift the random stream of the others.
+    """
+
+    # Draws per reading: angle and range deviates, spurious test and value, dropout test
+    DRAWS = 5
+
+    def __init__(self, range_std=0.05, angle_std=0.5, dropout_prob=0.01, spurious_prob=0.005):
+        """
+        Initialize the noise model.
+
+        Args:
+            range_std (float): Standard deviation of the range noise
+            angle_std (float): Standard deviation of the ray direction, in degrees
+            dropout_prob (float): Probability that a reading returns nothing
+            spurious_prob (float): Probability that a reading is a random short return
+        """
+        self.range_std = range_std
+        self.angle_std = angle_std
+        self.dropout_prob = dropout_prob
+        self.spurious_prob = spurious_prob
+
+    def sample(self, rng, shape):
+        """
+        Draw the random numbers for a batch of readings.
+
+        Args:
+            rng (numpy.random.Generator): Generator to draw from
+            shape (tuple): Shape of the batch of readings
+
+        Returns:
+            numpy.ndarray: Draws of shape (DRAWS, *shape)
+        """
+        shape = tuple(np.atleast_1d(shape))
+        normals = rng.standard_normal((2,) + shape)
+        uniforms = rng.random((3,) + shape)
+        return np.concatenate([normals, uniforms])
+
+    def jitter(self, angles, draws):
+        """
+        Perturb ray directions.
+
+        Args:
+            angles (numpy.ndarray): Ray angles in radians
+            draws (numpy.ndarray): Draws from sample() for the same readings
+
+        Returns:
+            numpy.ndarray: Perturbed angles in radians
+        """
+        return angles + math.radians(self.angle_std) * draws[0]
+
+    def corrupt(self, ranges, max_range, draws):
+        """
+        Apply range noise, spurious returns and dropouts to readings.
+
+        Args:
+            ranges (numpy.ndarray): Measured ranges
+            max_range (float): Maximum range of the sensor
+            draws (numpy.ndarray): Draws from sample() for the same readings
+
+        Returns:
+            numpy.ndarray: Noisy ranges within [0, max_range]
+        """
+        ranges = np.asarray(ranges, dtype=float)
+
+        # Only actual returns get range noise; a ray that hit nothing stays at max range
+        returned = ranges < max_range
+        noisy = np.where(returned, ranges + self.range_std * draws[1], ranges)
+        noisy = np.where(draws[2] < self.spurious_prob, draws[3] * max_range, noisy)
+        noisy = np.where(draws[4] < self.dropout_prob, max_range, noisy)
+        return np.clip(noisy, 0, max_range)
+
+    def apply(self, ranges, max_range, rng):
+        """
+        Corrupt a batch of readings with fresh draws from a generator.
+
+        Args:
+            ranges (numpy.ndarray): Measured ranges, any shape
+            max_range (float): Maximum range of the sensor
+            rng (numpy.random.Generator): Generator to draw from
+
+        Returns:
+            numpy.ndarray: Noisy ranges of the same shape
+        """
+        ranges = np.asarray(ranges, dtype=float)
+        return self.corrupt(ranges, max_range, self.sample(rng, ranges.shape))
+
+def _noisy_scan(origins, angles, environment, max_range, noise, draws, step_size=0.1):
+    """
+    Cast rays at jittered angles and return the noisy ranges, measured
+    along the nominal angles the sensor reports.
+    """
+    end_points, steps = _march_rays(origins, noise.jitter(angles, draws), environment, max_range, step_size)
+    ranges = np.linalg.norm(end_points - origins, axis=-1)
+    # Rays that ran their full length found nothing
+    ranges = np.where(steps >= _num_steps(max_range, step_size), max_range, ranges)
+    return noise.corrupt(ranges, max_range, draws)
+
+def simulate_lidar(position, heading, environment, num_rays=12, max_range=5, noise=None, rng=None):
     """
     Simulates a LiDAR sensor by casting rays in various directions and detecting obstacles.
-    
+
     Args:
         position (tuple): Current position (x, y)
         heading (float): Current heading in degrees
         environment (Environment): The environment object containing obstacle information
         num_rays (int): Number of rays to cast
         max_range (float): Maximum detection range
-        
+        noise (SensorNoiseModel): Optional noise applied to the readings
+        rng (numpy.random.Generator): Generator for the noise, e.g. the vehicle's own
+
     Returns:
         list: List of points where each ray ended (either hit an obstacle or reached max range)
     """
-    points = []
-    
-    # Convert heading to radians
-    heading_rad = math.radians(heading)
-    
-    # Cast rays in various angles around the vehicle
-    for i in range(num_rays):
-        # Calculate ray angle (spread rays evenly around the vehicle)
-        angle = heading_rad + (i * (2 * math.pi / num_rays))
-        
-        # Initialize ray start point
-        ray_x, ray_y = position
-        
-        # Step size for ray casting
-        step_size = 0.1
-        
-        # Ray length
-        ray_length = 0
-        
-        # Cast ray until it hits an obstacle or reaches max range
-        while ray_length < max_range:
-            # Move along the ray
-            ray_x += step_size * math.cos(angle)
-            ray_y += step_size * math.sin(angle)
-            ray_length += step_size
-            
-            # Check if we hit an obstacle
-            rounded_pos = (round(ray_x), round(ray_y))
-            if not environment.is_valid_position(rounded_pos):
-                break
-        
-        # Add the endpoint to the points list
-        points.append((ray_x, ray_y))
-    
-    return points
-
-def simulate_proximity_sensors(position, environment, num_sensors=4, max_range=2):
+    end_points = simulate_lidar_batch([position], [heading], environment, num_rays, max_range,
+                                      noise=noise, rngs=None if rng is None else [rng])[0]
+
+    return [(float(x), float(y)) for x, y in end_points]
+
+def simulate_lidar_batch(positions, headings, environment, num_rays=12, max_range=5, noise=None, rngs=None):
+    """
+    Simulates the LiDAR of a whole fleet, casting the rays of every vehicle
+    in one batch.
+
+    Args:
+        positions (list): Position (x, y) of every vehicle
+        headings (list): Heading of every vehicle in degrees
+        environment (Environment): The environment object containing obstacle information
+        num_rays (int): Number of rays per vehicle
+        max_range (float): Maximum detection range
+        noise (SensorNoiseModel): Optional noise applied to the readings
+        rngs (list): One numpy Generator per vehicle for the noise; fresh
+                     unseeded generators if None
+
+    Returns:
+        numpy.ndarray: Ray end points, shape (vehicles, num_rays, 2)
+    """
+    positions = np.asarray(positions, dtype=float)[:, :2]
+    count = len(positions)
+
+    # Spread rays evenly around each vehicle, starting at its heading, shape (V, R)
+    angles = np.radians(np.asarray(headings, dtype=float))[:, None] + np.arange(num_rays) * (2 * math.pi / num_rays)
+    origins = np.repeat(positions, num_rays, axis=0)
+
+    if noise is None:
+        # Cast all rays in one batch
+        end_points, _ = _march_rays(origins, angles.ravel(), environment, max_range)
+        return end_points.reshape(count, num_rays, 2)
+
+    # Each vehicle draws from its own generator, so its readings do not
+    # depend on the rest of the fleet
+    if rngs is None:
+        rngs = [np.random.default_rng() for _ in range(count)]
+    draws = np.stack([noise.sample(rng, num_rays) for rng in rngs], axis=1).reshape(noise.DRAWS, -1)
+    ranges = _noisy_scan(origins, angles.ravel(), environment, max_range, noise, draws)
+
+    # Report the readings along the nominal ray directions
+    directions = np.stack([np.cos(angles.ravel()), np.sin(angles.ravel())], axis=-1)
+    end_points = origins + ranges[:, None] * directions
+    return end_points.reshape(count, num_rays, 2)
+
+def simulate_proximity_sensors(position, environment, num_sensors=4, max_range=2, noise=None, rng=None):
     """
     Simulates proximity sensors (like ultrasonic sensors) at fixed positions around the vehicle.
-    
+
     Args:
         position (tuple): Current position (x, y)
         environment (Environment): The environment object containing obstacle information
         num_sensors (int): Number of sensors (4 = front, right, back, left)
         max_range (float): Maximum detection range
-        
+        noise (SensorNoiseModel): Optional noise applied to the readings
+        rng (numpy.random.Generator): Generator for the noise, e.g. the vehicle's own
+
     Returns:
         list: List of distances detected by each sensor
     """
-    distances = []
-    
+    step_size = 0.1
+
     # Sensor directions (in degrees)
     angles = [0, 90, 180, 270]  # Front, Right, Back, Left
-    
-    # Check each sensor
-    for angle in angles[:num_sensors]:
-        # Convert angle to radians
-        angle_rad = math.radians(angle)
-        
-        # Initialize sensor start point
-        sensor_x, sensor_y = position
-        
-        # Step size for detection
-        step_size = 0.1
-        
-        # Distance measured
-        distance = 0
-        
-        # Check until we hit an obstacle or reach max range
-        while distance < max_range:
-            # Move along the sensor direction
-            sensor_x += step_size * math.cos(angle_rad)
-            sensor_y += step_size * math.sin(angle_rad)
-            distance += step_size
-            
-            # Check if we hit an obstacle
-            rounded_pos = (round(sensor_x), round(sensor_y))
-            if not environment.is_valid_position(rounded_pos):
-                break
-        
-        # Add the distance to the list
-        distances.append(distance)
-    
-    return distances
+    angles_rad = np.radians(angles[:num_sensors])
+
+    if noise is not None:
+        rng = rng if rng is not None else np.random.default_rng()
+        origins = np.broadcast_to(np.asarray(position, dtype=float)[:2], (len(angles_rad), 2))
+        ranges = _noisy_scan(origins, angles_rad, environment, max_range, noise,
+                             noise.sample(rng, len(angles_rad)), step_size)
+        return [float(r) for r in ranges]
+
+    # Check all sensors in one batch
+    _, steps = _march_rays(position, angles_rad, environment, max_range, step_size)
+
+    return [float(n * step_size) for n in steps]
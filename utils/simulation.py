@@ -0,0 +1,362 @@
+import numpy as np
+import json
+import struct
+
+from utils.environment import Environment
+from utils.local_planner import DynamicWindowPlanner
+from utils.vehicle import Vehicle
+
+# Snapshot layout: header, packed obstacle bits, vehicle states (x, y,
+# heading, velocity, path index) as float64, then every path as a uint32
+# length followed by float64 (x, y) pairs, then the RNG states as JSON: the
+# run's generator and one per vehicle (version 1 stored only the run's)
+SNAPSHOT_MAGIC = b"AVSS"
+SNAPSHOT_VERSION = 2
+_HEADER = struct.Struct("<4sHQQQIIII")  # magic, version, tick, telemetry offset, log offset,
+                                        # width, height, vehicles, RNG state bytes
+_PATH_LENGTH = struct.Struct("<I")
+
+def encode_snapshot(environment, vehicles, paths, tick=0, telemetry_offset=0, log_offset=0, rng=None):
+    """
+    Encode the full state of a run as compact bytes.
+
+    Args:
+        environment (Environment): The environment (only the obstacle grid is stored)
+        vehicles (list): Vehicles in the run
+        paths (list): Path followed by each vehicle
+        tick (int): Simulation tick
+        telemetry_offset (int): Number of telemetry rows recorded so far
+        log_offset (int): Number of event log entries already applied
+        rng (numpy.random.Generator): Optional random generator of the run
+
+    Returns:
+        bytes: The snapshot
+    """
+    width, height = environment.grid_size
+    rng_state = json.dumps({
+        "run": rng.bit_generator.state if rng is not None else None,
+        "vehicles": [vehicle.rng.bit_generator.state for vehicle in vehicles],
+    }).encode()
+    states = np.array([(*vehicle.position[:2], vehicle.heading, vehicle.velocity, vehicle.path_index)
+                       for vehicle in vehicles], dtype='<f8').reshape(-1, 5)
+
+    parts = [
+        _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, tick, telemetry_offset, log_offset,
+                     width, height, len(vehicles), len(rng_state)),
+        np.packbits(environment.grid == 1).tobytes(),
+        states.tobytes(),
+    ]
+    for path in paths:
+        points = np.array([point[:2] for point in path], dtype='<f8').reshape(-1, 2)
+        parts.append(_PATH_LENGTH.pack(len(points)))
+        parts.append(points.tobytes())
+    parts.append(rng_state)
+    return b"".join(parts)
+
+def decode_snapshot(data):
+    """
+    Decode bytes produced by encode_snapshot().
+
+    Args:
+        data (bytes): The snapshot
+
+    Returns:
+        dict: grid, vehicles (list of (x, y, heading, velocity, path_index)),
+              paths, tick, telemetry_offset, log_offset, rng_state (None
+              if the run had no random generator) and vehicle_rng_states
+              (one per vehicle, None for snapshots that did not store them)
+    """
+    magic, version, tick, telemetry_offset, log_offset, width, height, count, rng_bytes = \
+        _HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC or version not in (1, SNAPSHOT_VERSION):
+        raise ValueError("Not a simulation snapshot, or an unsupported snapshot version")
+    offset = _HEADER.size
+
+    grid_bytes = (width * height + 7) // 8
+    bits = np.frombuffer(data, dtype=np.uint8, count=grid_bytes, offset=offset)
+    grid = np.unpackbits(bits, count=width * height).reshape(width, height).astype(int)
+    offset += grid_bytes
+
+    states = np.frombuffer(data, dtype='<f8', count=count * 5, offset=offset).reshape(count, 5)
+    offset += states.nbytes
+
+    paths = []
+    for _ in range(count):
+        (length,) = _PATH_LENGTH.unpack_from(data, offset)
+        offset += _PATH_LENGTH.size
+        points = np.frombuffer(data, dtype='<f8', count=length * 2, offset=offset).reshape(length, 2)
+        offset += points.nbytes
+        paths.append([(float(x), float(y)) for x, y in points])
+
+    rng_state = json.loads(data[offset:offset + rng_bytes]) if rng_bytes else None
+    if version == 1:
+        vehicle_rng_states = [None] * count
+    else:
+        rng_state, vehicle_rng_states = rng_state["run"], rng_state["vehicles"]
+    vehicles = [((float(x), float(y)), float(heading), float(velocity), int(index))
+                for x, y, heading, velocity, index in states]
+    return {
+        "grid": grid, "vehicles": vehicles, "paths": paths, "tick": tick,
+        "telemetry_offset": telemetry_offset, "log_offset": log_offset, "rng_state": rng_state,
+        "vehicle_rng_states": vehicle_rng_states,
+    }
+
+class EventLog:
+    """
+    Append-only log of the inputs that change a run: map edits, new paths
+    and manual pose changes. Every entry records the tick it happened at,
+    so replaying the log over the simulation reproduces the run exactly.
+    Entries can also be appended to a JSON-lines file as they happen.
+    """
+
+    def __init__(self, entries=None, path=None):
+        """
+        Initialize the log.
+
+        Args:
+            entries (list): Existing entries as (tick, kind, data) tuples
+            path (str): Optional file every new entry is appended to
+        """
+        self.entries = list(entries or [])
+        self.path = path
+
+    def append(self, tick, kind, data):
+        """
+        Record an event.
+
+        Args:
+            tick (int): Tick at which the event happened (before that tick's step)
+            kind (str): Event type
+            data (dict): JSON-serializable event arguments
+        """
+        self.entries.append((tick, kind, data))
+        if self.path is not None:
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"tick": tick, "kind": kind, "data": data}) + "\n")
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a log written with a path, keeping the file for further appends.
+
+        Args:
+            path (str): JSON-lines log file
+
+        Returns:
+            EventLog: The log
+        """
+        with open(path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        return cls([(r["tick"], r["kind"], r["data"]) for r in records], path=path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        return self.entries[index]
+
+class Simulation:
+    """
+    A deterministic run of vehicles following paths through an environment.
+
+    All inputs go through apply() and are recorded in an EventLog, and every
+    `checkpoint_interval` ticks a binary snapshot is kept. Any tick of the
+    run can then be rebuilt from the nearest earlier checkpoint plus the
+    log, and fork() branches a new run from there for what-if experiments.
+    """
+
+    def __init__(self, environment, vehicles, paths=None, seed=None, checkpoint_interval=50,
+                 log=None, local_planning=False):
+        """
+        Initialize the simulation.
+
+        Args:
+            environment (Environment): The environment the vehicles move in
+            vehicles (list): Vehicles in the run
+            paths (list): Optional initial path of each vehicle
+            seed (int): Seed of the run's random generator
+            checkpoint_interval (int): Ticks between automatic checkpoints (None to disable)
+            log (EventLog): Event log to record into (a new one by default)
+            local_planning (bool): Whether vehicles avoid obstacles with a DynamicWindowPlanner
+        """
+        self.environment = environment
+        self.vehicles = list(vehicles)
+        self.paths = [list(path) for path in paths] if paths is not None else [[] for _ in self.vehicles]
+        self.rng = np.random.default_rng(seed)
+        self.checkpoint_interval = checkpoint_interval
+        self.log = log if log is not None else EventLog()
+        self.local_planning = local_planning
+        # No time budget, so the planner's choices do not depend on machine speed
+        self.local_planner = DynamicWindowPlanner(environment, time_budget=None) if local_planning else None
+        self.tick = 0
+        self.telemetry_offset = 0  # One telemetry row per vehicle per tick
+        self.applied = len(self.log)  # Number of log entries reflected in the state
+        self.checkpoints = {}  # tick -> snapshot bytes
+        if checkpoint_interval:
+            self.checkpoint()
+
+    def apply(self, kind, **data):
+        """
+        Apply an input to the run and record it in the event log.
+
+        Supported events: add_obstacles(cells), remove_obstacles(cells),
+        clear_obstacles(), set_path(vehicle, path) and
+        set_pose(vehicle, position, heading).
+
+        Args:
+            kind (str): Event type
+            **data: Event arguments (JSON-serializable)
+        """
+        self._apply(kind, data)
+        self.log.append(self.tick, kind, data)
+        self.applied = len(self.log)
+
+    def _apply(self, kind, data):
+        if kind == "add_obstacles":
+            self.environment.fill_cells(data["cells"])
+        elif kind == "remove_obstacles":
+            self.environment.fill_cells(data["cells"], value=0)
+        elif kind == "clear_obstacles":
+            self.environment.clear_obstacles()
+        elif kind == "set_path":
+            vehicle = self.vehicles[data["vehicle"]]
+            self.paths[data["vehicle"]] = [tuple(point) for point in data["path"]]
+            vehicle.path_index = 0
+        elif kind == "set_pose":
+            vehicle = self.vehicles[data["vehicle"]]
+            vehicle.position = tuple(data["position"])
+            vehicle.heading = data["heading"]
+            vehicle.velocity = 0
+        else:
+            raise ValueError(f"Unknown event type: {kind}")
+
+    def random_obstacles(self, count=10, exclude=None):
+        """
+        Add obstacles at random cells drawn from the run's generator, recorded
+        as one add_obstacles event so replays do not depend on the generator.
+
+        Args:
+            count (int): Number of cells to draw
+            exclude (list): Positions that must stay free
+        """
+        excluded = {(int(round(p[0])), int(round(p[1]))) for p in (exclude or [])}
+        xs = self.rng.integers(0, self.environment.grid_size[0], size=count)
+        ys = self.rng.integers(0, self.environment.grid_size[1], size=count)
+        cells = [(int(x), int(y)) for x, y in zip(xs, ys) if (int(x), int(y)) not in excluded]
+        self.apply("add_obstacles", cells=cells)
+
+    def step(self):
+        """
+        Advance every vehicle one tick along its path.
+
+        Returns:
+            bool: True if every vehicle has reached the end of its path
+        """
+        done = [vehicle.follow_path(path, local_planner=self.local_planner)
+                for vehicle, path in zip(self.vehicles, self.paths)]
+        self.tick += 1
+        self.telemetry_offset += len(self.vehicles)
+        if self.checkpoint_interval and self.tick % self.checkpoint_interval == 0:
+            self.checkpoint()
+        return all(done)
+
+    def snapshot(self):
+        """
+        Returns:
+            bytes: Binary snapshot of the current state (see encode_snapshot)
+        """
+        return encode_snapshot(self.environment, self.vehicles, self.paths, self.tick,
+                               self.telemetry_offset, self.applied, self.rng)
+
+    def checkpoint(self):
+        """
+        Keep a snapshot of the current tick for replay() and fork().
+        """
+        self.checkpoints[self.tick] = self.snapshot()
+
+    @classmethod
+    def restore(cls, data, log=None, checkpoint_interval=50, local_planning=False):
+        """
+        Rebuild a simulation from a snapshot.
+
+        Args:
+            data (bytes): Snapshot from snapshot() or encode_snapshot()
+            log (EventLog): Event log of the run, for replaying past the snapshot
+            checkpoint_interval (int): Ticks between automatic checkpoints
+            local_planning (bool): Whether vehicles avoid obstacles with a DynamicWindowPlanner
+
+        Returns:
+            Simulation: A simulation in the snapshot's state
+        """
+        state = decode_snapshot(data)
+        width, height = state["grid"].shape
+        environment = Environment(grid_size=(width, height))
+        # The decoded grid is a fresh array, so adopt it instead of copying it in load_map
+        environment.grid = state["grid"]
+        environment.version += 1
+
+        vehicles = []
+        for (position, heading, velocity, path_index), rng_state in zip(state["vehicles"],
+                                                                        state["vehicle_rng_states"]):
+            vehicle = Vehicle(position, heading=heading, velocity=velocity, environment=environment)
+            vehicle.path_index = path_index
+            if rng_state is not None:
+                vehicle.rng.bit_generator.state = rng_state
+            vehicles.append(vehicle)
+
+        simulation = cls(environment, vehicles, state["paths"], checkpoint_interval=None,
+                         log=log, local_planning=local_planning)
+        if state["rng_state"] is not None:
+            simulation.rng.bit_generator.state = state["rng_state"]
+        simulation.tick = state["tick"]
+        simulation.telemetry_offset = state["telemetry_offset"]
+        simulation.applied = state["log_offset"]
+        simulation.checkpoint_interval = checkpoint_interval
+        simulation.checkpoints[simulation.tick] = data
+        return simulation
+
+    def replay(self, until_tick=None):
+        """
+        Catch up with the event log: apply every logged event not yet
+        reflected in the state, stepping the simulation to each event's tick.
+
+        Args:
+            until_tick (int): Stop at the start of this tick (before its events);
+                              by default replay the whole log
+        """
+        while self.applied < len(self.log):
+            tick, kind, data = self.log[self.applied]
+            if until_tick is not None and tick >= until_tick:
+                break
+            while self.tick < tick:
+                self.step()
+            self._apply(kind, data)
+            self.applied += 1
+        while until_tick is not None and self.tick < until_tick:
+            self.step()
+
+    def fork(self, tick):
+        """
+        Branch a new run at the start of a past tick, rebuilt from the nearest
+        earlier checkpoint and the event log instead of from tick 0. Events
+        applied to the fork do not affect this run.
+
+        Args:
+            tick (int): Tick to branch at
+
+        Returns:
+            Simulation: Independent simulation at the given tick
+        """
+        earlier = [t for t in self.checkpoints if t <= tick]
+        if not earlier:
+            raise ValueError(f"No checkpoint at or before tick {tick}")
+        snapshot = self.checkpoints[max(earlier)]
+
+        simulation = Simulation.restore(snapshot, log=EventLog(self.log.entries),
+                                        checkpoint_interval=self.checkpoint_interval,
+                                        local_planning=self.local_planning)
+        simulation.replay(until_tick=tick)
+        # The fork's history ends here; later events of this run are dropped
+        del simulation.log.entries[simulation.applied:]
+        simulation.checkpoints.update({t: s for t, s in self.checkpoints.items() if t <= tick})
+        return simulation
@@ -0,0 +1,244 @@
+import numpy as np
+import math
+
+class SpatialHash:
+    """
+    Uniform-grid spatial hash of moving points (e.g. the vehicles of a fleet).
+
+    Every item is kept in the bucket of the square cell containing it, so
+    radius and nearest-neighbor queries only look at the few cells around
+    the query point instead of every item. Collision checks for a whole
+    fleet are O(n) per tick instead of O(n^2). Items are moved
+    incrementally with update(), which only touches the buckets when an
+    item changes cell, or all at once with rebuild().
+    """
+
+    def __init__(self, cell_size=1.0):
+        """
+        Initialize an empty hash.
+
+        Args:
+            cell_size (float): Side of the square cells; about the usual query
+                               radius gives the fewest cells per query
+        """
+        self.cell_size = cell_size
+        self._buckets = {}  # cell -> set of item ids
+        self._positions = {}  # item id -> (x, y)
+        self._cells = {}  # item id -> cell
+        self._arrays = None  # (ids, id -> index, positions) of every item, for direct searches
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, item):
+        return item in self._positions
+
+    def _cell(self, position):
+        return (math.floor(position[0] / self.cell_size), math.floor(position[1] / self.cell_size))
+
+    def position(self, item):
+        """
+        Args:
+            item (hashable): Item id
+
+        Returns:
+            tuple: The item's position (x, y)
+        """
+        return self._positions[item]
+
+    def rebuild(self, items, positions):
+        """
+        Replace the contents of the hash, bucketing all items in one batch.
+
+        Args:
+            items (list): Item ids
+            positions (numpy.ndarray): Item positions, shape (N, 2)
+        """
+        items = list(items)
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        self._positions = {item: (float(x), float(y)) for item, (x, y) in zip(items, positions)}
+        self._arrays = None
+
+        # Sort the items by cell, then cut the order into one run per cell
+        cells = np.floor(positions / self.cell_size).astype(np.int64)
+        order = np.lexsort((cells[:, 1], cells[:, 0]))
+        sorted_cells = cells[order]
+        starts = np.flatnonzero(np.any(np.diff(sorted_cells, axis=0) != 0, axis=1)) + 1
+        starts = np.concatenate([[0], starts]) if len(order) else starts
+
+        self._buckets = {}
+        for start, run in zip(starts, np.split(order, starts[1:])):
+            cell = (int(sorted_cells[start, 0]), int(sorted_cells[start, 1]))
+            self._buckets[cell] = {items[i] for i in run}
+        self._cells = {items[i]: (int(cx), int(cy)) for i, (cx, cy) in zip(order, sorted_cells)}
+
+    def insert(self, item, position):
+        """
+        Add an item, or move it if it is already in the hash.
+
+        Args:
+            item (hashable): Item id
+            position (tuple): Position (x, y)
+        """
+        self.update(item, position)
+
+    def update(self, item, position):
+        """
+        Move an item (inserting it if needed). Buckets only change when the
+        item crosses into another cell.
+
+        Args:
+            item (hashable): Item id
+            position (tuple): New position (x, y)
+        """
+        position = (float(position[0]), float(position[1]))
+        cell = self._cell(position)
+        old_cell = self._cells.get(item)
+        if old_cell != cell:
+            if old_cell is not None:
+                self._discard(item, old_cell)
+            self._buckets.setdefault(cell, set()).add(item)
+            self._cells[item] = cell
+        self._positions[item] = position
+        self._arrays = None
+
+    def remove(self, item):
+        """
+        Remove an item, if present.
+
+        Args:
+            item (hashable): Item id
+        """
+        if item in self._positions:
+            self._discard(item, self._cells.pop(item))
+            del self._positions[item]
+            self._arrays = None
+
+    def _discard(self, item, cell):
+        bucket = self._buckets[cell]
+        bucket.discard(item)
+        if not bucket:
+            del self._buckets[cell]
+
+    def _candidates(self, position, reach):
+        """
+        Ids and positions of the items in every cell within reach cells of
+        the cell containing position.
+        """
+        cx, cy = self._cell(position)
+        ids = []
+        for x in range(cx - reach, cx + reach + 1):
+            for y in range(cy - reach, cy + reach + 1):
+                bucket = self._buckets.get((x, y))
+                if bucket:
+                    ids.extend(bucket)
+        positions = np.array([self._positions[item] for item in ids], dtype=float).reshape(-1, 2)
+        return ids, positions
+
+    def query_radius(self, position, radius, exclude=None):
+        """
+        Find the items within a distance of a point.
+
+        Args:
+            position (tuple): Query point (x, y)
+            radius (float): Search radius
+            exclude (hashable): Optional item id to leave out (e.g. the querying vehicle)
+
+        Returns:
+            list: (item, distance) pairs within radius, nearest first
+        """
+        reach = max(int(math.ceil(radius / self.cell_size)), 0)
+        ids, positions = self._candidates(position, reach)
+        if not ids:
+            return []
+
+        distances = np.hypot(positions[:, 0] - position[0], positions[:, 1] - position[1])
+        order = np.argsort(distances, kind='stable')
+        return [(ids[i], float(distances[i])) for i in order
+                if distances[i] <= radius and ids[i] != exclude]
+
+    def nearest(self, position, k=1, max_radius=None, exclude=None):
+        """
+        Find the k items nearest to a point, scanning the cells ring by ring
+        outwards until no unscanned cell can hold a nearer item. Once more
+        cells would have been scanned than there are occupied buckets, every
+        item is searched directly instead, so sparse or far items stay cheap.
+
+        Args:
+            position (tuple): Query point (x, y)
+            k (int): Number of neighbors
+            max_radius (float): Optional limit on the neighbor distance
+            exclude (hashable): Optional item id to leave out (e.g. the querying vehicle)
+
+        Returns:
+            list: Up to k (item, distance) pairs, nearest first
+        """
+        count = len(self._positions) - (exclude in self._positions)
+        if k <= 0 or count <= 0:
+            return []
+        k = min(k, count)
+        limit = float('inf') if max_radius is None else max_radius
+
+        cx, cy = self._cell(position)
+        ids, distances = [], np.zeros(0)
+        ring = 0
+        while True:
+            if (2 * ring + 1) ** 2 > len(self._buckets):
+                # Cheaper to look at every item than at more, mostly empty, cells
+                if self._arrays is None:
+                    all_ids = list(self._positions)
+                    self._arrays = (all_ids, {item: i for i, item in enumerate(all_ids)},
+                                    np.array([self._positions[item] for item in all_ids], dtype=float).reshape(-1, 2))
+                ids, index, positions = self._arrays
+                distances = np.hypot(positions[:, 0] - position[0], positions[:, 1] - position[1])
+                if exclude in index:
+                    # Sorts last, after the k items counted without it
+                    distances[index[exclude]] = np.inf
+                break
+
+            new_ids = [item for item in self._ring(cx, cy, ring) if item != exclude]
+            if new_ids:
+                positions = np.array([self._positions[item] for item in new_ids], dtype=float)
+                ids.extend(new_ids)
+                distances = np.concatenate([distances, np.hypot(positions[:, 0] - position[0],
+                                                                positions[:, 1] - position[1])])
+
+            # Items in later rings are at least this far away
+            reach = ring * self.cell_size
+            if reach > limit or (len(ids) >= k and np.partition(distances, k - 1)[k - 1] <= reach):
+                break
+            ring += 1
+
+        order = np.argsort(distances, kind='stable')
+        return [(ids[i], float(distances[i])) for i in order[:k] if distances[i] <= limit]
+
+    def _ring(self, cx, cy, ring):
+        """
+        Ids of the items in the cells exactly ring cells away (Chebyshev
+        distance) from cell (cx, cy).
+        """
+        if ring == 0:
+            cells = [(cx, cy)]
+        else:
+            cells = [(x, cy + dy) for x in range(cx - ring, cx + ring + 1) for dy in (-ring, ring)]
+            cells += [(cx + dx, y) for y in range(cy - ring + 1, cy + ring) for dx in (-ring, ring)]
+        ids = []
+        for cell in cells:
+            bucket = self._buckets.get(cell)
+            if bucket:
+                ids.extend(bucket)
+        return ids
+
+    def collides(self, position, radius, exclude=None):
+        """
+        Check if any item is closer to a point than a distance.
+
+        Args:
+            position (tuple): Query point (x, y)
+            radius (float): Minimum allowed distance (e.g. twice the vehicle radius)
+            exclude (hashable): Optional item id to leave out (e.g. the moving vehicle)
+
+        Returns:
+            bool: True if an item is closer than radius
+        """
+        return any(distance < radius for _, distance in self.query_radius(position, radius, exclude))
@@ -6,7 +6,12 @@ class Vehicle:
     Represents a vehicle/robot in the simulation with position, heading, and movement capabilities.
     """
     
-    def __init__(self, position, heading=0, velocity=0, environment=None):
+    MAX_TURN_RATE = 15  # degrees per step
+    MOVE_SPEED = 0.2  # units per step
+    WAYPOINT_TOLERANCE = 0.2  # distance at which a waypoint counts as reached
+    RADIUS = 0.3  # footprint radius for collisions with other vehicles
+    
+    def __init__(self, position, heading=0, velocity=0, environment=None, seed=None, fleet=None, vehicle_id=None):
         """
         Initialize the vehicle.
         
@@ -15,12 +20,32 @@ class Vehicle:
             heading (float): Initial heading in degrees (0 = right, 90 = up)
             velocity (float): Initial velocity
             environment (Environment): Reference to the environment
+            seed (int): Seed of the vehicle's random generator, used for sensor noise
+            fleet (SpatialHash): Optional spatial hash shared by the vehicles of a fleet;
+                                 moves into another vehicle are rejected
+            vehicle_id (hashable): Key of the vehicle in the fleet; defaults to id(vehicle)
         """
+        self.fleet = fleet
+        self.vehicle_id = vehicle_id if vehicle_id is not None else id(self)
         self.position = position
         self.heading = heading
         self.velocity = velocity
         self.environment = environment
         self.path_index = 0  # For following a planned path
+        self.rng = np.random.default_rng(seed)  # One generator per vehicle keeps noisy runs reproducible
+        
+    @property
+    def position(self):
+        """
+        Current position (x, y). Setting it also moves the vehicle in its fleet.
+        """
+        return self._position
+    
+    @position.setter
+    def position(self, position):
+        self._position = position
+        if self.fleet is not None:
+            self.fleet.update(self.vehicle_id, position)
         
     def move(self, distance):
         """
@@ -39,11 +64,44 @@ class Vehicle:
         
         # Check if new position is valid
         if self.environment and self.environment.is_valid_position((new_x, new_y)):
+            if self.fleet is not None and self._blocked_by_fleet((new_x, new_y)):
+                return False
             self.position = (new_x, new_y)
             return True
         
         return False
         
+    def _blocked_by_fleet(self, new_position):
+        """
+        Check if a move would run into another vehicle of the fleet. Moves
+        that increase the distance to an overlapping vehicle are allowed, so
+        vehicles that start overlapping can separate.
+        """
+        contact = 2 * self.RADIUS
+        for other, distance in self.fleet.query_radius(new_position, contact, exclude=self.vehicle_id):
+            other_x, other_y = self.fleet.position(other)
+            current = math.hypot(self.position[0] - other_x, self.position[1] - other_y)
+            if distance < contact and distance < current:
+                return True
+        return False
+    
+    def nearby_vehicles(self, radius, k=None):
+        """
+        Find other vehicles of the fleet around this one.
+        
+        Args:
+            radius (float): Search radius
+            k (int): Optional number of nearest vehicles to return
+            
+        Returns:
+            list: (vehicle_id, distance) pairs, nearest first (empty without a fleet)
+        """
+        if self.fleet is None:
+            return []
+        if k is not None:
+            return self.fleet.nearest(self.position, k, max_radius=radius, exclude=self.vehicle_id)
+        return self.fleet.query_radius(self.position, radius, exclude=self.vehicle_id)
+        
     def turn(self, angle):
         """
         Turn the vehicle by the specified angle.
@@ -53,16 +111,22 @@ class Vehicle:
         """
         self.heading = (self.heading + angle) % 360
         
-    def follow_path(self, path):
+    def follow_path(self, path, local_planner=None):
         """
         Follow a pre-planned path.
         
         Args:
             path (list): List of positions to follow
+            local_planner (DynamicWindowPlanner): Optional local planner that
+                                                  steers around obstacles instead
+                                                  of heading straight at each waypoint
             
         Returns:
             bool: True if reached the end of the path, False otherwise
         """
+        if local_planner is not None:
+            return local_planner.step(self, path)
+        
         if not path or self.path_index >= len(path):
             return True
         
@@ -74,12 +138,17 @@ class Vehicle:
         dy = target[1] - self.position[1]
         distance = math.sqrt(dx**2 + dy**2)
         
-        # If we're close enough to the target, move to the next point
-        if distance < 0.2:
+        # If we're close enough to the target, move on to the next point
+        # within the same step instead of pausing at the waypoint. The small
+        # margin keeps waypoints exactly one step apart from being skipped.
+        while distance < self.WAYPOINT_TOLERANCE - 1e-9:
             self.path_index += 1
             if self.path_index >= len(path):
                 return True
-            return False
+            target = path[self.path_index]
+            dx = target[0] - self.position[0]
+            dy = target[1] - self.position[1]
+            distance = math.sqrt(dx**2 + dy**2)
         
         # Calculate the angle to the target
         target_angle = math.degrees(math.atan2(dy, dx)) % 360
@@ -90,14 +159,12 @@ class Vehicle:
             angle_diff -= 360
         
         # Turn towards the target (with a maximum turn rate)
-        max_turn_rate = 15  # degrees per step
-        turn_amount = max(-max_turn_rate, min(max_turn_rate, angle_diff))
+        turn_amount = max(-self.MAX_TURN_RATE, min(self.MAX_TURN_RATE, angle_diff))
         self.turn(turn_amount)
         
         # Move towards the target
-        move_speed = 0.2  # units per step
-        self.velocity = move_speed
-        self.move(move_speed)
+        self.velocity = self.MOVE_SPEED
+        self.move(self.MOVE_SPEED)
         
         return False
     